@@ -2,6 +2,7 @@
 
 import click
 
+from odevio import trace
 from odevio.commands.build import build
 from odevio.commands.user import signup, signin, signout, profile, apikey
 from odevio.commands.team import team
@@ -11,12 +12,21 @@ from odevio.helpers import check_new_version
 
 
 @click.group()
+@click.option('--trace', 'trace_file', type=click.Path(dir_okay=False, writable=True),
+              help="Record the timings of the command (HTTP requests, retries, build phases) in a JSON trace file")
+@click.option('--profile', 'profile_file', type=click.Path(dir_okay=False, writable=True),
+              help="Run the command under a profiler and write the profile to this file")
+@click.option('--profile-format', type=click.Choice(["pstats", "collapsed"]), default="pstats", show_default=True,
+              help="pstats: cProfile output. collapsed: sampled stacks for flamegraph tools")
+@click.option('--profile-top', type=int, default=20, show_default=True,
+              help="Number of functions to print when the profiled command is finished")
 @click.version_option(version='1.2.1', message="""Odevio, %(version)s
 Copyright (C) 2023 Odevio‡
 License : The MIT License
 This is free software: you are free to change and redistribute it.
 There is NO WARRANTY, to the extent permitted by law.""")
-def odevio():
+@click.pass_context
+def odevio(ctx, trace_file, profile_file, profile_format, profile_top):
     """ Command line tool to build & release your flutter apps easily.
 
     \b
@@ -51,7 +61,16 @@ def odevio():
 
     Usage:
     """
-    check_new_version()
+    if profile_file:
+        from odevio import profiling
+        ctx.call_on_close(profiling.start(profile_file, profile_format, profile_top))
+
+    if trace_file:
+        trace.enable()
+        ctx.call_on_close(lambda: trace.write(trace_file))
+
+    with trace.span("check new version"):
+        check_new_version()
 
 
 # register the subgroups to the main CLI commands
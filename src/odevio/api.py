@@ -10,17 +10,24 @@ from click import ClickException
 
 import requests
 from rich.prompt import Prompt
+from odevio import trace
 from odevio.helpers import print_validation_error
 
 from odevio.settings import API_BASE_URL, console, get_jwt_token, write_jwt_token, delete_jwt_token
 
 
-def _request(method, route, params=None, data=None, files=None, authorization=True, auth_data=None, json_decode=True, tries=5, sse=False):
+# Shared between threads so the connections are reused, for example when watching several builds at once
+session = requests.Session()
+session.mount("https://", requests.adapters.HTTPAdapter(pool_maxsize=32))
+session.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=32))
+
+
+def _request(method, route, params=None, data=None, files=None, authorization=True, auth_data=None, json_decode=True, tries=5, sse=False, extra_headers=None, timeout=None):
     """ General request wrapper for Odevio API.
 
     :return dict of the JSON returned by the API or False if an error occurred
     """
-    headers = dict()
+    headers = dict(extra_headers or {})
     if not sse:
         headers["Accept"] = "application/json"
     if authorization:
@@ -34,20 +41,31 @@ def _request(method, route, params=None, data=None, files=None, authorization=Tr
 
         headers["Authorization"] = auth_headers
 
-    try:
-        response = requests.request(
-            method,
-            f"{API_BASE_URL}{'/events' if sse else '/api/v1'}{route}",
-            headers=headers,
-            params=params,
-            data=data,
-            files=files,
-            stream=sse
-        )
-    except requests.exceptions.ConnectionError:
+    with trace.span(f"{method.upper()} {route}", "http", tries_left=tries) as span:
+        try:
+            response = session.request(
+                method,
+                f"{API_BASE_URL}{'/events' if sse else '/api/v1'}{route}",
+                headers=headers,
+                params=params,
+                data=data,
+                files=files,
+                stream=sse,
+                timeout=timeout,
+            )
+        except requests.exceptions.ConnectionError:
+            response = None
+            span.set(error="connection error")
+        else:
+            # elapsed covers connection setup and server processing up to the response headers, the rest of the span
+            # is spent locally and downloading the body
+            span.set(status=response.status_code, headers_ms=round(response.elapsed.total_seconds()*1000, 1))
+
+    if response is None:
         if tries > 0:
-            time.sleep(2)
-            return _request(method, route, params, data, files, authorization, auth_data, json_decode, tries-1)
+            with trace.span("retry sleep", "http", route=route):
+                time.sleep(2)
+            return _request(method, route, params, data, files, authorization, auth_data, json_decode, tries-1, sse, extra_headers, timeout)
         raise ClickException("Server not available")
 
     if response.ok:
@@ -72,8 +90,9 @@ def _request(method, route, params=None, data=None, files=None, authorization=Tr
         elif response.status_code == 404:
             raise NotFoundException()
         elif response.status_code in [302, 503] and tries > 0:  # Update or maintenance
-            time.sleep(2)
-            return _request(method, route, params, data, files, authorization, auth_data, json_decode, tries-1)
+            with trace.span("retry sleep", "http", route=route, status=response.status_code):
+                time.sleep(2)
+            return _request(method, route, params, data, files, authorization, auth_data, json_decode, tries-1, sse, extra_headers, timeout)
         else:
             if response.status_code == 503:
                 raise ClickException("The server is currently in maintenance. Please try again in a few moments.")
@@ -81,12 +100,34 @@ def _request(method, route, params=None, data=None, files=None, authorization=Tr
             raise ClickException(f"{method.upper()} {route} failed: {error}")
 
 
-def get(route, params=None, authorization=True, auth_data=None, json_decode=True, sse=False):
+def get(route, params=None, authorization=True, auth_data=None, json_decode=True, sse=False, headers=None, timeout=None):
     """ GET method wrapper for Odevio API.
 
     :return dict of the JSON returned by the API or False if an error occurred
     """
-    return _request("get", route, params=params, authorization=authorization, auth_data=auth_data, json_decode=json_decode, sse=sse)
+    return _request("get", route, params=params, authorization=authorization, auth_data=auth_data, json_decode=json_decode, sse=sse, extra_headers=headers, timeout=timeout)
+
+
+def get_pages(route, params=None):
+    """ GETs a list from the Odevio API page by page, following the cursor of the next page until there is none.
+
+    Routes that are not paginated return the whole list, which is the only page.
+
+    :return a generator of the list of items of each page
+    """
+    from urllib.parse import parse_qs, urlsplit
+
+    while True:
+        page = get(route, params=params)
+        if not page:
+            return
+        if isinstance(page, list):
+            yield page
+            return
+        yield page.get("results", [])
+        if not page.get("next"):
+            return
+        params = parse_qs(urlsplit(page["next"]).query)  # Has the filters of the first page along with the cursor
 
 
 def post(route, authorization=True, json_data=None, params=None, files=None, auth_data=None):
@@ -0,0 +1,96 @@
+#                                   #
+#   Local queue of builds to start  #
+#                                   #
+import json
+import os
+import sqlite3
+import time
+
+import click
+
+from odevio.settings import APP_NAME
+
+# Status of a queued build before it is submitted. Once submitted, its status is the one of the build.
+PENDING = "pending"
+PACKAGING = "packaging"
+SUBMITTED = "submitted"
+ERROR = "error"
+
+
+def get_queue_path():
+    """ :return the path of the SQLite database of the build queue """
+    return os.path.join(click.get_app_dir(APP_NAME), "queue.db")
+
+
+def connect():
+    """ :return a connection to the build queue, in autocommit mode """
+    directory = click.get_app_dir(APP_NAME)
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+    connection = sqlite3.connect(get_queue_path(), timeout=30, isolation_level=None)
+    connection.row_factory = sqlite3.Row
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS builds (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            directory TEXT NOT NULL,
+            spec TEXT NOT NULL,
+            status TEXT NOT NULL,
+            build_key TEXT,
+            error TEXT,
+            added REAL NOT NULL
+        )
+    """)
+    return connection
+
+
+def add(connection, directory, spec):
+    """ Queues a build.
+
+    :param spec: dict of the parameters of the build, as sent to the API
+    :return the id of the queued build
+    """
+    cursor = connection.execute("INSERT INTO builds (directory, spec, status, added) VALUES (?, ?, ?, ?)",
+                                (directory, json.dumps(spec), PENDING, time.time()))
+    return cursor.lastrowid
+
+
+def list_items(connection):
+    """ :return the queued builds, oldest first """
+    return connection.execute("SELECT * FROM builds ORDER BY id").fetchall()
+
+
+def remove(connection, item_id):
+    """ :return True if the queued build existed """
+    return connection.execute("DELETE FROM builds WHERE id = ?", (item_id,)).rowcount > 0
+
+
+def claim_next(connection):
+    """ Marks the oldest pending build as being packaged, so another scheduler can't start it too.
+
+    :return the claimed build or None if there is no pending build
+    """
+    while True:
+        item = connection.execute("SELECT * FROM builds WHERE status = ? ORDER BY id LIMIT 1", (PENDING,)).fetchone()
+        if item is None:
+            return None
+        claimed = connection.execute("UPDATE builds SET status = ? WHERE id = ? AND status = ?",
+                                     (PACKAGING, item["id"], PENDING)).rowcount
+        if claimed:
+            return item
+
+
+def set_status(connection, item_id, status, build_key=None, error=None):
+    connection.execute("UPDATE builds SET status = ?, build_key = COALESCE(?, build_key), error = ? WHERE id = ?",
+                       (status, build_key, error, item_id))
+
+
+def package(directory, base_name):
+    """ Zips a project directory, excluding the files listed in its .odevioignore, or in the one of the current
+    directory if it has none. Run in worker processes so the compression does not hold up the other builds.
+
+    :return the path of the zip file, base_name + ".zip"
+    """
+    from odevio.helpers import find_project_file, read_ignore_file, zip_directory
+
+    excluded_dirs, excluded_files = read_ignore_file(find_project_file(directory, ".odevioignore"))
+    return zip_directory(directory, excluded_dirs, excluded_files, base_name)
@@ -2,6 +2,7 @@ import click
 
 from odevio import settings
 from odevio.helpers import login_required_warning_decorator
+from odevio.models import Application, DeveloperAccount, Team
 
 
 @click.group()
@@ -29,7 +30,7 @@ def ls():
     from odevio import api
     from odevio.settings import console
 
-    apps = api.get("/applications/")
+    apps = [Application.from_api(a) for a in api.get("/applications/") or []]
 
     if apps:
         table_apps = Table()
@@ -39,7 +40,7 @@ def ls():
         table_apps.add_column("Bundle ID")
         table_apps.add_column("Account")
         for app in apps:
-            table_apps.add_row(app['key'], app['name'], app['apple_name'], app['bundle_id'], app['account']['name'] + " (" + app['account']['key'] + ")")
+            table_apps.add_row(app.key, app.name, app.apple_name, app.bundle_id, app.account.name + " (" + app.account.key + ")")
 
         console.print(table_apps)
     else:
@@ -69,7 +70,7 @@ def mk(name, bundle_id, account_key):
     from odevio.settings import console
 
     if account_key is None:
-        account_key = terminal_menu("/developer-accounts/", "Developer Account",
+        account_key = terminal_menu("/developer-accounts/", "Developer Account", model=DeveloperAccount,
                                     does_not_exist_msg=Text.from_markup(textwrap.dedent(
                                         f"""
                                             No developer accounts are linked to your profile. Check out [code]$ odevio apple add [/code] to link your developer account to Odevio.
@@ -105,7 +106,7 @@ def rm(key, delete_on_apple):
     from odevio.settings import console
 
     if key is None:
-        key = terminal_menu("/applications/", "Application",
+        key = terminal_menu("/applications/", "Application", model=Application,
                             does_not_exist_msg="You do not have any app identifiers.")
         if key is None:
             return
@@ -134,12 +135,12 @@ def link(key, team_key):
     from odevio.settings import console
 
     if key is None:
-        key = terminal_menu("/applications/?manager=me", "Application", does_not_exist_msg="You do not have any app identifier.")
+        key = terminal_menu("/applications/?manager=me", "Application", model=Application, does_not_exist_msg="You do not have any app identifier.")
         if key is None:
             return
 
     if team_key is None:
-        team_key = terminal_menu("/teams/", "Team", does_not_exist_msg="You are not part of any team.")
+        team_key = terminal_menu("/teams/", "Team", model=Team, does_not_exist_msg="You are not part of any team.")
         if team_key is None:
             return
 
@@ -165,12 +166,12 @@ def unlink(key, team_key):
     from odevio.settings import console
 
     if key is None:
-        key = terminal_menu("/applications/?manager=me&hasteams=1", "Application", does_not_exist_msg="You do not have any app identifiers in a team.")
+        key = terminal_menu("/applications/?manager=me&hasteams=1", "Application", model=Application, does_not_exist_msg="You do not have any app identifiers in a team.")
         if key is None:
             return
 
     if team_key is None:
-        team_key = terminal_menu(f"/applications/{key}/teams/", "Team", does_not_exist_msg="This app is not part of any team")
+        team_key = terminal_menu(f"/applications/{key}/teams/", "Team", model=Team, does_not_exist_msg="This app is not part of any team")
         if team_key is None:
             return
 
@@ -196,7 +197,7 @@ def import_app(name, bundle_id, account_key):
     from odevio.settings import console
 
     if account_key is None:
-        account_key = terminal_menu("/developer-accounts/", "Developer Account",
+        account_key = terminal_menu("/developer-accounts/", "Developer Account", model=DeveloperAccount,
                                     does_not_exist_msg=Text.from_markup(textwrap.dedent(
                                         f"""
                                             No developer accounts are linked to your profile. Check out [code]$ odevio apple add [/code] to link your developer account to Odevio.
@@ -229,7 +230,7 @@ def screenshots(key):
     from odevio.settings import console
 
     if key is None:
-        key = terminal_menu("/applications/", "Application",
+        key = terminal_menu("/applications/", "Application", model=Application,
                             does_not_exist_msg="You do not have any app identifiers.")
         if key is None:
             return
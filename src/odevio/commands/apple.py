@@ -1,6 +1,7 @@
 import click
 
 from odevio.helpers import login_required_warning_decorator, terminal_menu
+from odevio.models import DeveloperAccount, Team
 
 
 @click.group("apple")
@@ -77,7 +78,7 @@ def developer_account_detail(key):
     from odevio.helpers import terminal_menu
 
     if key is None:
-        key = terminal_menu("/developer-accounts/", "Developer account",
+        key = terminal_menu("/developer-accounts/", "Developer account", model=DeveloperAccount,
                                 does_not_exist_msg=Text.from_markup(textwrap.dedent(
                                     f"""
                                             You have no Apple developer accounts setup with Odevio. Check out [code]$ odevio apple add [/code] to add one.
@@ -157,7 +158,7 @@ def developer_account_ls():
     from odevio import api
     from odevio.settings import console
 
-    developer_accounts = api.get("/developer-accounts/")
+    developer_accounts = [DeveloperAccount.from_api(da) for da in api.get("/developer-accounts/") or []]
 
     if len(developer_accounts) > 0:
         table = Table(title="Apple Developer Accounts you have access to")
@@ -167,7 +168,7 @@ def developer_account_ls():
         table.add_column("Team ID")
         table.add_column("Apple API Key ID")
         for da in developer_accounts:
-            table.add_row(da['key'], da['name'], da['manager'], da['apple_id'], da['api_key_id'])
+            table.add_row(da.key, da.name, da.manager, da.apple_id, da.api_key_id)
 
         console.print(table)
 
@@ -234,7 +235,7 @@ def developer_account_edit(key, apple_id=None, name=None):
     import textwrap
 
     if key is None:
-        key = terminal_menu("/developer-accounts/", "Developer account",
+        key = terminal_menu("/developer-accounts/", "Developer account", model=DeveloperAccount,
                             does_not_exist_msg=Text.from_markup(textwrap.dedent(
                                 f"""
                                             You have no Apple developer accounts setup with Odevio. Check out [code]$ odevio apple add [/code] to add one.
@@ -275,7 +276,7 @@ def developer_account_rm(key):
     import textwrap
 
     if key is None:
-        key = terminal_menu("/developer-accounts/?manager=me", "Developer account",
+        key = terminal_menu("/developer-accounts/?manager=me", "Developer account", model=DeveloperAccount,
                             does_not_exist_msg=Text.from_markup(textwrap.dedent(
                                 f"""
                                             You have no Apple developer accounts setup with Odevio. Check out [code]$ odevio apple add [/code] to add one.
@@ -311,13 +312,13 @@ def link(key, team_key):
     from odevio.helpers import terminal_menu
 
     if key is None:
-        key = terminal_menu("/developer-accounts/?manager=me", "Developer account",
+        key = terminal_menu("/developer-accounts/?manager=me", "Developer account", model=DeveloperAccount,
                             does_not_exist_msg="You are not the manager of any apple developer accounts")
         if key is None:
             return
 
     if team_key is None:
-        team_key = terminal_menu("/teams/", "Team", does_not_exist_msg="You are not part of any teams")
+        team_key = terminal_menu("/teams/", "Team", model=Team, does_not_exist_msg="You are not part of any teams")
         if team_key is None:
             return
 
@@ -341,13 +342,13 @@ def unlink(key, team_key):
     from odevio.helpers import terminal_menu
 
     if key is None:
-        key = terminal_menu("/developer-accounts/?manager=me&hasteams=1", "Apple account",
+        key = terminal_menu("/developer-accounts/?manager=me&hasteams=1", "Apple account", model=DeveloperAccount,
                             does_not_exist_msg="You do not have any apple developer accounts in a team")
         if key is None:
             return
 
     if team_key is None:
-        team_key = terminal_menu(f"/developer-accounts/{key}/teams/", "Team", does_not_exist_msg="This developer account isn't shared with any team")
+        team_key = terminal_menu(f"/developer-accounts/{key}/teams/", "Team", model=Team, does_not_exist_msg="This developer account isn't shared with any team")
         if team_key is None:
             return
 
@@ -377,7 +378,7 @@ def refresh_devices(key, quiet):
     from odevio.helpers import terminal_menu
 
     if key is None:
-        key = terminal_menu("/developer-accounts/", "Apple account",
+        key = terminal_menu("/developer-accounts/", "Apple account", model=DeveloperAccount,
                             does_not_exist_msg="You do not have any apple developer accounts")
         if key is None:
             return
@@ -1,12 +1,13 @@
 import json
-import re
-import subprocess
-from datetime import datetime
+import sys
+from contextlib import contextmanager
+from datetime import datetime, timezone
 
 import click
-import sseclient
 
+from odevio import trace
 from odevio.helpers import login_required_warning_decorator, ssh_tunnel, print_qrcode, get_version_and_build
+from odevio.models import Application, Build, format_datetime, parse_datetime
 
 
 @click.group('build')
@@ -28,43 +29,83 @@ def build():
     pass
 
 
+BUILD_STATUSES = ["created", "waiting_instance", "in_progress", "config", "succeeded", "failed", "stopped"]
+
+
 @build.command()
 @login_required_warning_decorator
 @click.option('-a', '--all', 'show_all', default=False, is_flag=True,
               help="shows your builds and the builds from your teams")
-def ls(show_all):
-    """ Lists builds on Odevio. """
+@click.option('--limit', type=click.IntRange(min=1), help="Maximum number of builds to show, most recent first")
+@click.option('--status', type=click.Choice(BUILD_STATUSES), help="Only shows the builds with this status")
+@click.option('--app', 'app_key', help="Only shows the builds of the application with this key")
+@click.option('--type', 'build_type', help="Only shows the builds of this type",
+              type=click.Choice(["configuration", "development", "ad-hoc", "distribution", "validation", "publication"]))
+@click.option('--since', type=click.DateTime(formats=["%Y-%m-%d", "%Y-%m-%dT%H:%M", "%Y-%m-%d %H:%M"]),
+              help="Only shows the builds started after this date, in local time")
+def ls(show_all, limit, status, app_key, build_type, since):
+    """ Lists builds on Odevio.
+
+    The filters are applied by the server and imply --all. Builds are shown as they are received, page by page.
+    """
     from odevio import api
     from odevio.settings import console
+    from rich import box
     from rich.syntax import Syntax
     from rich.table import Table
 
+    params = {}
+    if status:
+        params["status"] = status
+    if app_key:
+        params["application"] = app_key
+    if build_type:
+        params["type"] = build_type
+    if since:
+        params["since"] = since.astimezone().isoformat()
+    filtered = bool(params)
+    if filtered:
+        show_all = True
     if show_all:
-        builds = api.get("/builds/", params={"all": 1})
-    else:
-        builds = api.get("/builds/")
-
-    if builds:
-        table = Table()
-        table.add_column("KEY")
-        table.add_column("App")
-        table.add_column("Name")
-        table.add_column("Started at")
-        table.add_column("Finished at")
-        table.add_column("Status")
-        table.add_column("Build Type")
-        table.add_column("Started by")
-        table.add_column("Certificate")
-        table.add_column("Profile")
-
-        for b in builds:
-            table.add_row(b['key'], b['application'], b['name'], b['start_time'],
-                          b['finish_time'], b['status'], b['build_type'], b['creator'],
-                          b['certificate'], b['profile'])
+        params["all"] = 1
+    if limit:
+        params["limit"] = limit
+
+    count = 0
+    for page in api.get_pages("/builds/", params=params):
+        if limit:
+            page = page[:limit - count]
+        if not page:
+            continue
+        # The widths of the columns only depend on the width of the terminal, so that the rows of each page line up
+        # with the header of the first one
+        table = Table(box=box.SIMPLE_HEAD, show_edge=False, show_header=count == 0, expand=True)
+        table.add_column("KEY", ratio=2)
+        table.add_column("App", ratio=2)
+        table.add_column("Name", ratio=2)
+        table.add_column("Started at", ratio=3)
+        table.add_column("Finished at", ratio=3)
+        table.add_column("Status", ratio=2)
+        table.add_column("Build Type", ratio=2)
+        table.add_column("Started by", ratio=2)
+        table.add_column("Certificate", ratio=1)
+        table.add_column("Profile", ratio=1)
+
+        for b in page:
+            b = Build.from_api(b)
+            table.add_row(b.key, b.application, b.name, format_datetime(b.start_time),
+                          format_datetime(b.finish_time), b.status, b.build_type, b.creator,
+                          b.certificate, b.profile)
 
         console.print(table)
-    else:
-        if show_all:
+        count += len(page)
+        if limit and count >= limit:
+            break
+
+    if not count:
+        if filtered:
+            console.print("No build matches these filters.")
+        elif show_all:
             code = Syntax(code="$ odevio build start SOURCE_DIRECTORY --app-key APPLICATION_KEY", lexer="shell")
             console.print(f"You did not launch any builds. Create one with")
             console.print(code)
@@ -92,7 +133,7 @@ def rm(key):
     from rich.text import Text
 
     if key is None:
-        key = terminal_menu("/builds/", "Builds", api_params={"all": 1}, name=build_name,
+        key = terminal_menu("/builds/", "Builds", model=Build, api_params={"all": 1}, name=build_name,
                                     does_not_exist_msg=Text.from_markup(textwrap.dedent(
                                         f"""
                                             You have not run any builds yet.
@@ -128,7 +169,7 @@ def detail(key):
     from rich.text import Text
 
     if key is None:
-        key = terminal_menu("/builds/", "Builds", api_params={"all": 1}, name=build_name,
+        key = terminal_menu("/builds/", "Builds", model=Build, api_params={"all": 1}, name=build_name,
                                     does_not_exist_msg=Text.from_markup(textwrap.dedent(
                                         f"""
                                             You have not run any builds yet.
@@ -190,14 +231,36 @@ def detail(key):
         console.print("This build does not exist or you cannot access it.")
 
 
-def _show_build_progress(ctx, build_instance, tunnel_port=None, tunnel_host=None, tunnel_remote_port=None, no_progress=False):
+def _ndjson_event(key, event, data):
+    """ :return a line of the NDJSON output of the progress of a build """
+    return json.dumps({
+        "ts": datetime.now(timezone.utc).isoformat(),
+        "build": key,
+        "event": event,
+        "data": data,
+    }) + "\n"
+
+
+def _show_build_progress(ctx, build_instance, tunnel_port=None, tunnel_host=None, tunnel_remote_port=None, no_progress=False, no_tty=False, output="text", running_builds=None):
+    """ Follows the progress of a build until it is finished.
+
+    running_builds is the number of builds that were queued or in progress when it was submitted.
+
+    :return True if the build succeeded, False otherwise
+    """
+    from rich.markup import escape
     from rich.syntax import Syntax
     from rich.text import Text
     from odevio.settings import console
     from odevio import api
     from odevio.helpers import handle_error
+    from odevio.diagnosis import FailureClassifier
+    from odevio.history import LogWriter
+    from odevio.logsink import LogSink, PlainStatus
+    from odevio.sse import build_events
 
     build_type = build_instance['build_type']
+    ndjson = output == "ndjson"
 
     console.print(f"{build_instance['name']} has been registered. It has key \"{build_instance['key']}\" "
                   f"and will be started as soon as possible.")
@@ -232,13 +295,29 @@ def _show_build_progress(ctx, build_instance, tunnel_port=None, tunnel_host=None
         else:
             spinner_text = "Building..."
     else:
-        return
-    with console.status(spinner_text, spinner="line") as spinner:
-        res = api.get(f"/builds/{build_instance['key']}/logs", sse=True)
-        client = sseclient.SSEClient(res)
-        for event in client.events():
-            if event.event == "status":
-                status = json.loads(event.data)
+        if ndjson:
+            sys.stdout.write(_ndjson_event(build_instance['key'], "status", status))
+        return status in ["config", "succeeded"]
+    phase = _trace_phase(None, status, build_instance['key'])
+    classifier = FailureClassifier()
+    if ndjson:
+        sink = LogSink()
+        status_display = PlainStatus(spinner_text, None)
+        sink.write(_ndjson_event(build_instance['key'], "status", status))
+    elif no_tty:
+        sink = LogSink()
+        status_display = PlainStatus(spinner_text, sink)
+    else:
+        sink = LogSink(console)
+        status_display = console.status(spinner_text, spinner="line")
+    with status_display as spinner, sink, LogWriter(build_instance, submitted=True, running_builds=running_builds) as log_file:
+        for event, data in build_events(build_instance['key']):
+            if ndjson:
+                sink.write(_ndjson_event(build_instance['key'], event, data))
+            if event == "status":
+                status = data
+                phase = _trace_phase(phase, status, build_instance['key'])
+                log_file.set_status(status)
                 if status == "created":
                     spinner.update("Looking for available instance...")
                 elif status == "waiting_instance":
@@ -247,34 +326,43 @@ def _show_build_progress(ctx, build_instance, tunnel_port=None, tunnel_host=None
                     spinner.update("Building...")
                 elif status == "config":
                     spinner.update("Configured for remote access")
-                    res.close()
-                    break
                 elif status == "succeeded":
                     spinner.update("Success!")
-                    res.close()
-                    break
                 elif status == "failed":
                     spinner.update("Failed")
-                    res.close()
-                    break
                 elif status == "stopped":
                     spinner.update("Stopped")
-                    res.close()
-                    break
-            elif event.event == "substatus":
-                substatus = json.loads(event.data)
-                if substatus == "starting_instance":
+            elif event == "substatus":
+                log_file.set_substatus(data)
+                if data == "starting_instance":
                     spinner.update("Starting instance...")
-                elif substatus == "preparing_build":
+                elif data == "preparing_build":
                     spinner.update("Preparing build...")
-                elif substatus == "building":
+                elif data == "building":
                     spinner.update("Building...")
-                elif substatus == "getting_result":
+                elif data == "getting_result":
                     spinner.update("Getting result...")
-                elif substatus == "publishing":
+                elif data == "publishing":
                     spinner.update("Publishing...")
-            elif event.event == "log":
-                print(json.loads(event.data), end="")
+            elif event == "cache" and not ndjson:  # Already written as an event in ndjson
+                if no_tty:
+                    sink.write(f"Dependency cache {_cache_message(data)}\n")
+                else:
+                    sink.flush()
+                    console.print(Text.from_markup(f"[dim]Dependency cache {escape(_cache_message(data))}[/dim]"))
+            elif event == "log":
+                if not ndjson:
+                    sink.write(data)
+                log_file.write(data)
+                for name, description, line in classifier.feed(data):
+                    if ndjson:
+                        sink.write(_ndjson_event(build_instance['key'], "diagnosis", {"cause": name, "description": description, "line": line}))
+                    elif no_tty:
+                        sink.write(f"Likely cause of failure: {description}\n")
+                    else:
+                        sink.flush()
+                        console.print(Text.from_markup(f"[yellow]Likely cause of failure:[/yellow] {description}"))
+    _trace_phase(phase, None, build_instance['key'])
 
     if status in ["config", "succeeded"]:
         console.print(Text.from_markup(f"\n\nYour build has succeeded, congrats ! Leave us a star on GitHub, we'd greatly appreciate it:"))
@@ -283,7 +371,12 @@ def _show_build_progress(ctx, build_instance, tunnel_port=None, tunnel_host=None
         if build_type == "publication":
             console.print("It will appear on your App Store Connect account shortly")
         if build_type == "ad-hoc":
-            ipa({build_instance['key']})
+            if ndjson:
+                response = api.get(f"/builds/{build_instance['key']}/ipa/")
+                if response:
+                    sys.stdout.write(_ndjson_event(build_instance['key'], "ipa", response['url']))
+            else:
+                ipa({build_instance['key']})
         if status == "config":
             ctx.invoke(connect, key=build_instance['key'], tunnel_port=tunnel_port, tunnel_host=tunnel_host, tunnel_remote_port=tunnel_remote_port)
         return True
@@ -291,10 +384,40 @@ def _show_build_progress(ctx, build_instance, tunnel_port=None, tunnel_host=None
         build_instance = api.get(f"/builds/{build_instance['key']}/")
         if "error_message" in build_instance:
             console.print(Text.from_markup(f"[red]Error: {build_instance['error_message']}[/red]"))
-        handle_error(build_instance['key'])
+        if classifier.causes:
+            console.print("Odevio identified the likely cause of the error in the logs:")
+            for name, description, line in classifier.causes:
+                console.print(Text.from_markup(f"  - {description}\n    [dim]{escape(line)}[/dim]"))
+        else:
+            handle_error(build_instance['key'])
         return False
 
 
+def _cache_message(data):
+    """ :return a description of a cache event, whose data is the name of the cache and whether it was a hit """
+    return f"{data.get('name')}: {'hit' if data.get('hit') else 'miss'}"
+
+
+def _trace_phase(phase, status, key):
+    """ Traces the queue wait and build phases of a build from its status.
+
+    :return the (name, span) of the current phase, ending the previous one if the status moved to another phase
+    """
+    if status in ["created", "waiting_instance"]:
+        name = "queue wait"
+    elif status == "in_progress":
+        name = "build"
+    else:
+        name = None
+    if phase is not None:
+        if phase[0] == name:
+            return phase
+        phase[1].finish(final_status=status)
+    if name is None:
+        return None
+    return name, trace.span(name, "build", key=key)
+
+
 @build.command()
 @login_required_warning_decorator
 @click.argument('app-key', required=False)
@@ -315,8 +438,22 @@ def _show_build_progress(ctx, build_instance, tunnel_port=None, tunnel_host=None
 @click.option('--tunnel-remote-port', type=int, help="If --tunnel-port is specified, this is the port on the VM (defaults to the same port, except for 22 and 5900)")
 @click.option('--no-progress', is_flag=True, help="Do not display the progress and exit the command immediately.")
 @click.option('--no-flutter-warning', is_flag=True, help="Do not display a warning if no flutter version is specified and the local flutter version does not match the build version.")
+@click.option('--no-tty', is_flag=True, help="Display the progress as plain text lines instead of a spinner, for logs and CI.")
+@click.option('--output', type=click.Choice(["text", "ndjson"]), default="text",
+              help="ndjson: write the progress on stdout as one JSON object per event, and exit with code 1 if the build fails. Other messages are written on stderr.")
+@click.option('--max-wait', type=click.IntRange(min=0), metavar="MINUTES",
+              help="Do not submit the build if the estimated wait for an instance is longer than this, see --on-max-wait.")
+@click.option('--on-max-wait', type=click.Choice(["refuse", "wait"]), default="refuse",
+              help="refuse: exit with an error if the estimated wait exceeds --max-wait. wait: wait until it does not before uploading the build.")
+@click.option('--matrix', type=click.Path(exists=True, dir_okay=False),
+              help="File listing several combinations of build type, flavor, target and mode to build from a single upload")
+@click.option('--project', 'projects', multiple=True,
+              type=click.Path(exists=True, resolve_path=True, file_okay=False, dir_okay=True),
+              help="Start a build for each of these project directories instead of DIRECTORY. Can be specified multiple times.")
+@click.option('--force', is_flag=True, help="Build even if a previous build of the same sources with the same configuration succeeded.")
+@click.option('--prewarm', is_flag=True, help="Reserve an instance before zipping and uploading the sources, so it starts in the meantime.")
 @click.pass_context
-def start(ctx, build_type, flutter, minimal_ios_version, app_version, build_number, mode, target, flavor, post_build_command, tunnel_port, tunnel_host, tunnel_remote_port, no_progress, no_flutter_warning, app_key=None, directory=None):
+def start(ctx, build_type, flutter, minimal_ios_version, app_version, build_number, mode, target, flavor, post_build_command, tunnel_port, tunnel_host, tunnel_remote_port, no_progress, no_flutter_warning, no_tty, output, max_wait, on_max_wait, matrix, projects, force, prewarm, app_key=None, directory=None):
     """ Start a new build from scratch
 
     DIRECTORY : Home directory of the flutter project. If not provided, gets the current directory.
@@ -342,8 +479,9 @@ def start(ctx, build_type, flutter, minimal_ios_version, app_version, build_numb
     Killing this command will not stop the build. You can check the progress of all your Odevio-Remotes by running
     :code:`odevio build ls` or get detailed information by running :code:`odevio build detail` and selecting your build.
 
-    To avoid having to specify all the parameters each time, you can create a .odevio file in the directory where the
-    command is run. Each parameter is specified on a line in the form PARAM=VALUE. For example:
+    To avoid having to specify all the parameters each time, you can create a .odevio file in the project directory or
+    in the directory where the command is run. Each parameter is specified on a line in the form PARAM=VALUE. For
+    example:
 
     .. code-block::
 
@@ -351,6 +489,33 @@ def start(ctx, build_type, flutter, minimal_ios_version, app_version, build_numb
        flutter=3.0.0
        minimal-ios-version=11.0
 
+    Before uploading, the wait for an instance is estimated from the builds running on your account and teams and
+    from how long past builds waited with as many builds running. With --max-wait, the build is not submitted while
+    the estimate is longer than this number of minutes.
+
+    To build several flavors, targets, modes or build types of the app, list them in a matrix file given with --matrix
+    (or matrix=FILE in .odevio). Each line is a build, with parameters in the form PARAM=VALUE separated by spaces.
+    The project is uploaded once, all the builds are created from it and their progress is followed together. For
+    example:
+
+    .. code-block::
+
+       build-type=ad-hoc flavor=staging
+       build-type=publication flavor=production mode=release
+
+    To start the builds of several apps at once, for example in a monorepo, give their directories with --project.
+    Each project is configured by its own .odevio and .odevioignore files, or by the ones of the current directory,
+    and the options given on the command line apply to all of them. The projects are zipped in parallel and their
+    builds are followed together. app-key and build-type have to be set for each project.
+
+    If a previous build of the same sources with the same build type, Flutter version, mode, flavor, target and
+    minimal iOS version succeeded, its result can be reused instead of building again, unless --force is given. This
+    is asked in a terminal, and done without asking with --no-tty, --output ndjson or when the input is not a
+    terminal. This does not apply to configuration and publication builds.
+
+    With --prewarm, an instance is reserved for the build before the sources are zipped and uploaded, so it is
+    started in the meantime. The reservation is cancelled if the build is not submitted.
+
     All files and directories in the provided directory will be uploaded, except:
 
         * build/
@@ -365,19 +530,43 @@ def start(ctx, build_type, flutter, minimal_ios_version, app_version, build_numb
         * .app.zip
         * odevio.patch
 
-    You can also specify additional files and directories in a .odevioignore file, with each files and directories
-    you want to ignore on separate lines, with directories ending with '/'
+    You can also specify additional files and directories in a .odevioignore file in the project directory or in the
+    directory where the command is run, with each files and directories you want to ignore on separate lines, with
+    directories ending with '/'
 
     """
     import os
+    import tempfile
     import textwrap
+    from contextlib import nullcontext
     import questionary
-    from odevio import api
-    from odevio.helpers import terminal_menu, zip_directory
+    from odevio import api, history
+    from odevio.tasks import TaskGraph
+    from odevio.helpers import terminal_menu, zip_directory, read_ignore_file, read_odevio_file, find_project_file, source_digest, lock_fingerprints, local_flutter_version, latest_flutter_version, set_server_supports
     from odevio.settings import console
     from rich.text import Text
     from questionary import Choice
 
+    if output == "ndjson":
+        console.file = sys.stderr
+
+    if projects:
+        if directory is not None:
+            raise click.ClickException("DIRECTORY can't be used with --project")
+        _start_projects(ctx, projects, {
+            "app-key": app_key,
+            "build-type": build_type,
+            "flutter": flutter,
+            "minimal-ios-version": minimal_ios_version,
+            "app-version": app_version,
+            "build-number": build_number,
+            "mode": mode,
+            "target": target,
+            "flavor": flavor,
+            "post-build-command": post_build_command,
+        }, no_progress, output, max_wait, on_max_wait)
+        return
+
     if directory is None:
         directory = os.getcwd()
 
@@ -391,65 +580,95 @@ def start(ctx, build_type, flutter, minimal_ios_version, app_version, build_numb
     if post_build_command:
         post_build_commands = list(post_build_command)
 
-    # Get options from .odevio file
-    if os.path.isfile(".odevio"):
-        with open(".odevio") as config:
-            for i, line in enumerate(config.readlines()):
-                split = line.split("=")
-                if len(split) != 2:
-                    print("Error in .odevio file line "+str(i+1)+": should be KEY=VALUE")
-                    continue
-                key = split[0].strip()
-                if key[0] == "#":  # Ignore commented lines
-                    continue
-                value = split[1].strip()
-                if key == "app-key":
-                    if not app_key:
-                        app_key = value
-                elif key == "build-type":
-                    if not build_type:
-                        build_type = value
-                elif key == "flutter":
-                    if not flutter:
-                        flutter = value
-                elif key == "minimal-ios-version":
-                    if not minimal_ios_version:
-                        minimal_ios_version = value
-                elif key == "app-version":
-                    if not app_version:
-                        app_version = value
-                elif key == "build-number":
-                    if not build_number:
-                        build_number = int(value)
-                elif key == "mode":
-                    if not mode:
-                        mode = value
-                elif key == "target":
-                    if not target:
-                        target = value
-                elif key == "flavor":
-                    if not flavor:
-                        flavor = value
-                elif key == "post-build-command":
-                    if not post_build_command:
-                        post_build_commands.append(value)
-                elif key == "tunnel-port":
-                    if not tunnel_port:
-                        tunnel_port = int(value)
-                elif key == "tunnel-host":
-                    if not tunnel_host:
-                        tunnel_host = value
-                elif key == "tunnel-remote-port":
-                    if not tunnel_remote_port:
-                        tunnel_remote_port = int(value)
-                elif key == "no-progress":
-                    if no_progress is None:
-                        no_progress = value in ["1", "true", "True"]
-                elif key == "no-flutter-warning":
-                    if no_flutter_warning is None:
-                        no_flutter_warning = value in ["1", "true", "True"]
-                else:
-                    console.print(f"Warning: unknown option '{key}' in .odevio")
+    # Get options from .odevio file, in the project directory or in the current directory
+    for key, value in read_odevio_file(find_project_file(directory, ".odevio")):
+        if key == "app-key":
+            if not app_key:
+                app_key = value
+        elif key == "build-type":
+            if not build_type:
+                build_type = value
+        elif key == "flutter":
+            if not flutter:
+                flutter = value
+        elif key == "minimal-ios-version":
+            if not minimal_ios_version:
+                minimal_ios_version = value
+        elif key == "app-version":
+            if not app_version:
+                app_version = value
+        elif key == "build-number":
+            if not build_number:
+                build_number = int(value)
+        elif key == "mode":
+            if not mode:
+                mode = value
+        elif key == "target":
+            if not target:
+                target = value
+        elif key == "flavor":
+            if not flavor:
+                flavor = value
+        elif key == "post-build-command":
+            if not post_build_command:
+                post_build_commands.append(value)
+        elif key == "tunnel-port":
+            if not tunnel_port:
+                tunnel_port = int(value)
+        elif key == "tunnel-host":
+            if not tunnel_host:
+                tunnel_host = value
+        elif key == "tunnel-remote-port":
+            if not tunnel_remote_port:
+                tunnel_remote_port = int(value)
+        elif key == "no-progress":
+            if no_progress is None:
+                no_progress = value in ["1", "true", "True"]
+        elif key == "no-flutter-warning":
+            if no_flutter_warning is None:
+                no_flutter_warning = value in ["1", "true", "True"]
+        elif key == "no-tty":
+            if not no_tty:
+                no_tty = value in ["1", "true", "True"]
+        elif key == "max-wait":
+            if max_wait is None:
+                max_wait = int(value)
+        elif key == "on-max-wait":
+            if on_max_wait == "refuse":
+                on_max_wait = value
+        elif key == "matrix":
+            if not matrix:
+                matrix = value
+        elif key == "prewarm":
+            if not prewarm:
+                prewarm = value in ["1", "true", "True"]
+        else:
+            console.print(f"Warning: unknown option '{key}' in .odevio")
+
+    # The tasks can't prompt for credentials while a menu is shown, so the user is logged in before they start
+    if not api.get_authorization_header():
+        return
+
+    # Zip the sources, compute their digest, count the running builds and probe the flutter versions while the build
+    # is being configured. The graph is closed before the temporary directory is removed, which stops the tasks if the
+    # command is aborted.
+    temp_dir = ctx.with_resource(tempfile.TemporaryDirectory())
+    graph = ctx.with_resource(TaskGraph())
+    excluded_dirs, excluded_files = read_ignore_file(find_project_file(directory, ".odevioignore"))
+    graph.add("digest", lambda: source_digest(directory, excluded_dirs, excluded_files, cancelled=graph.cancelled))
+    graph.add("running builds", _count_running_builds)
+    graph.add("zip", lambda: zip_directory(directory, excluded_dirs, excluded_files, os.path.join(temp_dir, "source"),
+                                           cancelled=graph.cancelled))
+    if not flutter:
+        graph.add("latest flutter", latest_flutter_version)
+        if not no_flutter_warning:
+            graph.add("local flutter", local_flutter_version)
+
+    combinations = _read_matrix(matrix) if matrix else None
+    if combinations:
+        if any(combination.get("build_type", build_type) == "configuration" for combination in combinations):
+            raise click.ClickException("Configuration builds can't be part of a build matrix.")
+        build_type = combinations[0].get("build_type", build_type)
 
     # Select build type if it was not specified
     if build_type is None:
@@ -466,26 +685,32 @@ def start(ctx, build_type, flutter, minimal_ios_version, app_version, build_numb
         extra_options = []
         if build_type == "configuration":
             extra_options = [{'key': "", 'name': "No application (xcode will not be configured)"}]
-        app_key = terminal_menu("/applications/", "Application",
+        app_key = terminal_menu("/applications/", "Application", model=Application,
                                     does_not_exist_msg=Text.from_markup(textwrap.dedent(
                                         f"""
                                             You have no app identifiers in your account. Check out [code]$ odevio app mk [/code] to create an app identifier.
                                         """
-                                    )), name=lambda a: a['name']+(f" ({a['key']})" if a['key'] != "" else ""), extra_options=extra_options)
+                                    )), name=lambda a: a.name+(f" ({a.key})" if a.key != "" else ""), extra_options=extra_options)
         if app_key is None:
             return
         if app_key == "":
             app_key = None
 
-    if build_type in ["validation", "publication"]:
-        permission = api.get(f"/builds/publication-permission/{app_key}")
+    # The lines of a build matrix without build type have the one of the first line
+    build_types = {combination.get("build_type", build_type) for combination in combinations} if combinations else {build_type}
+
+    # Both checks are requested at once, before the prompts that use their results. They apply to the whole matrix if
+    # any of its builds is a validation or a publication.
+    if build_types & {"validation", "publication"}:
+        graph.add("permission", lambda: api.get(f"/builds/publication-permission/{app_key}"))
+    if "publication" in build_types:
+        graph.add("buildnumber", lambda: api.get(f"/applications/{app_key}/buildnumber"))
+
+    if graph.has("permission"):
+        permission = graph.result("permission")
         if permission["free"]:
             if permission.get("next_build_date"):
-                permission['next_build_date'] = permission['next_build_date'][:-3] + permission['next_build_date'][-2:]  # Remove timezone ':' otherwise it can't parse
-                try:
-                    next_build_date = datetime.strptime(permission["next_build_date"], "%Y-%m-%dT%H:%M:%S.%f%z").astimezone()
-                except ValueError:
-                    next_build_date = datetime.strptime(permission["next_build_date"], "%Y-%m-%dT%H:%M:%S%z").astimezone()
+                next_build_date = parse_datetime(permission["next_build_date"])
                 console.print(f"Error: as a free Odevio user, you can only make one publication every {permission['days_delay']} days. You will be able to make a new build on {next_build_date.strftime('%Y-%m-%d at %H:%M')}")
                 console.print("To upgrade your account and make as many publication as you want, please go to https://odevio.com/plans")
                 return
@@ -508,8 +733,8 @@ def start(ctx, build_type, flutter, minimal_ios_version, app_version, build_numb
             console.stderr("Error getting version and build number from pubspec.yaml: "+str(e))
 
     # Show warning if the build number has already been used
-    if build_type == "publication":
-        max_build_number = api.get(f"/applications/{app_key}/buildnumber")
+    if graph.has("buildnumber"):
+        max_build_number = graph.result("buildnumber")
         if max_build_number and build_number <= max_build_number:
             res = console.input(f"You have specified {build_number} as build number but you have already made a publication build with number {max_build_number}. To change it, either supply the --build-number parameter or modify it in pubspec.yaml. Do you want to continue anyway? (y/N) ")
             if res not in ["y", "Y"]:
@@ -517,81 +742,843 @@ def start(ctx, build_type, flutter, minimal_ios_version, app_version, build_numb
 
     # If no flutter version is explicitly specified, check that the local version matches the one of the build so the user doesn't get unexpected errors
     try:
-        if not no_flutter_warning and not flutter:
-            flutter_version_output = subprocess.run("flutter --version", stdout=subprocess.PIPE, text=True, shell=True)
-            if flutter_version_output.returncode == 0:
-                match = re.match(r"Flutter ([^\s]+) ", flutter_version_output.stdout)
-                if match:
-                    local_version = match.group(1)
-                    build_version = api.get("/flutter-versions/latest")['version']
-                    if local_version.split("-")[0].split(".")[:2] != build_version.split("-")[0].split(".")[:2]:  # Only check major and minor
-                        console.print(f"Warning: your local flutter version is {local_version} but the build will be run with the latest flutter version ({build_version}). This could lead to unexpected errors if you have not tested your code with version {build_version}. To avoid this, specify the flutter version you want to use with the --flutter parameter or in a .odevio file.")
-                        menu_entry_index = questionary.select(
-                            "What do you want to do?",
-                            choices=[
-                                Choice("Continue anyway", 0),
-                                Choice(f"Set the build version to {local_version}", 1),
-                                Choice("Cancel and specify the version yourself", 2),
-                            ],
-                            qmark="",
-                        ).ask()
-                        if menu_entry_index is None:  # When ctrl-C, exit
-                            exit()
-                        if menu_entry_index == 2:
-                            return
-                        if menu_entry_index == 1:
-                            flutter = local_version
+        if graph.has("local flutter"):
+            local_version = graph.result("local flutter")
+            build_version = graph.result("latest flutter")
+            if local_version and build_version:
+                if local_version.split("-")[0].split(".")[:2] != build_version.split("-")[0].split(".")[:2]:  # Only check major and minor
+                    console.print(f"Warning: your local flutter version is {local_version} but the build will be run with the latest flutter version ({build_version}). This could lead to unexpected errors if you have not tested your code with version {build_version}. To avoid this, specify the flutter version you want to use with the --flutter parameter or in a .odevio file.")
+                    menu_entry_index = questionary.select(
+                        "What do you want to do?",
+                        choices=[
+                            Choice("Continue anyway", 0),
+                            Choice(f"Set the build version to {local_version}", 1),
+                            Choice("Cancel and specify the version yourself", 2),
+                        ],
+                        qmark="",
+                    ).ask()
+                    if menu_entry_index is None:  # When ctrl-C, exit
+                        exit()
+                    if menu_entry_index == 2:
+                        return
+                    if menu_entry_index == 1:
+                        flutter = local_version
     except Exception:  # If flutter is not installed or the command fails, ignore it
         pass
 
-    console.print(f"Zipping {directory}")
-    excluded_dirs = []
-    excluded_files = []
-    if os.path.isfile(".odevioignore"):
-        with open(".odevioignore") as ignore:
-            for line in ignore.readlines():
-                line = line.strip()
-                if line == "":
+    running_builds = graph.result("running builds")
+    if running_builds is not None:
+        running_builds = _check_queue_wait(max_wait, on_max_wait, running_builds)
+
+    fields = {
+        "application": app_key,
+        "build_type": build_type,
+        "min_sdk": minimal_ios_version,
+        "flutter_version": flutter,
+        "app_version": app_version,
+        "build_number": build_number,
+        "mode": mode,
+        "target": target,
+        "flavor": flavor,
+        "post_build_commands": post_build_commands,
+    }
+    if combinations:
+        combinations = [{**{field: fields[field] for field in MATRIX_PARAMS.values()}, **combination}
+                        for combination in combinations]
+        fields.update(combinations[0])
+
+    flutter_version = flutter or graph.result("latest flutter")
+    fields.update(lock_fingerprints(directory, flutter_version))
+    fields["source_digest"] = graph.result("digest")
+
+    if build_type not in ["configuration", "publication"] and not combinations and flutter_version:
+        fields["result_fingerprint"] = _result_fingerprint(fields, flutter_version)
+        if not force:
+            cached_key = _find_cached_result(fields["result_fingerprint"])
+            if cached_key and _reuse_result(ctx, cached_key, build_type, output, no_tty):
+                return
+
+    with _reserve_instance(fields) if prewarm else nullcontext({}) as reservation:
+        if reservation.get("key"):
+            fields["reservation"] = reservation["key"]
+        build_instance = _submit_uploaded_source(fields)
+
+        if not build_instance:
+            if not graph.done("zip"):
+                console.print(f"Zipping {directory}")
+            zip_file = graph.result("zip")
+
+            file_size_mb = round(os.path.getsize(zip_file)/1000000, 2)
+
+            if file_size_mb > 500:
+                console.print("Zipped directory size exceeds 500MB, very large applications are not supported by Odevio. Make sure that all files and directories not needed to build are listed in .odevioignore")
+                return
+
+            # Start build
+            console.print(f"Uploading {directory} ({file_size_mb} MB)")
+            build_instance = _submit_build(fields, zip_file)
+        reservation["used"] = bool(build_instance)
+
+    if build_instance and fields.get("result_fingerprint"):
+        history.update_record(build_instance['key'], result_fingerprint=fields["result_fingerprint"])
+        if build_instance.get("result_fingerprint") == fields["result_fingerprint"]:  # Stored by the server
+            set_server_supports("result_fingerprint")
+
+    if combinations:
+        builds = _start_matrix(build_instance, combinations[1:]) if build_instance else []
+        if builds and not no_progress:
+            _follow_builds(ctx, builds, output=output, submitted=True)
+        if output == "ndjson" and len(builds) < len(combinations):
+            ctx.exit(1)
+        return
+
+    if build_instance:
+        succeeded = _show_build_progress(ctx, build_instance, tunnel_port, tunnel_host, tunnel_remote_port, no_progress, no_tty, output, running_builds)
+        if output == "ndjson" and not no_progress and not succeeded:
+            ctx.exit(1)
+    elif output == "ndjson":
+        ctx.exit(1)
+
+
+MATRIX_PARAMS = {"build-type": "build_type", "flavor": "flavor", "target": "target", "mode": "mode"}
+
+
+def _read_matrix(path):
+    """ Reads a build matrix file, where each line is a build with parameters in the form PARAM=VALUE separated by
+    spaces. Empty lines and lines starting with # are ignored.
+
+    :return a list of {API field: value} dicts of the parameters of each build
+    """
+    combinations = []
+    with open(path) as matrix_file:
+        for i, line in enumerate(matrix_file.readlines()):
+            line = line.strip()
+            if not line or line[0] == "#":
+                continue
+            combination = {}
+            for param in line.split():
+                key, _, value = param.partition("=")
+                if key not in MATRIX_PARAMS or not value:
+                    raise click.ClickException(f"Error in {path} line {i+1}: {param} should be PARAM=VALUE, with PARAM one of {', '.join(MATRIX_PARAMS)}")
+                combination[MATRIX_PARAMS[key]] = value
+            combinations.append(combination)
+    if not combinations:
+        raise click.ClickException(f"{path} does not list any build")
+    return combinations
+
+
+def _start_matrix(build_instance, combinations):
+    """ Creates a build for each combination of parameters from the sources uploaded for build_instance, concurrently.
+
+    :return the build instances of build_instance and of the builds that could be created
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    from odevio import api
+    from odevio.settings import console
+
+    def rebuild(combination):
+        with trace.span("rebuild", **combination):
+            created = api.post(f"/builds/{build_instance['key']}/rebuild/", json_data=combination)
+            return created and api.get(f"/builds/{created['key']}/")
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        base = executor.submit(api.get, f"/builds/{build_instance['key']}/")
+        created = list(executor.map(rebuild, combinations))
+        builds = [base.result() or build_instance]
+    for combination, b in zip(combinations, created):
+        if b:
+            builds.append(b)
+        else:
+            console.print(f"Could not create the build {', '.join(f'{field}={value}' for field, value in combination.items())}")
+    console.print(f"Created {len(builds)} builds from the uploaded sources: {', '.join(b['key'] for b in builds)}")
+    return builds
+
+
+def _project_fields(directory, options, latest_flutter_version=None):
+    """ :return the fields of the build of the project in directory, from the options given on the command line, or
+    else from the .odevio file of the project
+    """
+    import os
+
+    from odevio.helpers import find_project_file, lock_fingerprints, read_odevio_file
+
+    options = dict(options)
+    post_build_commands = list(options.pop("post-build-command"))
+    use_file_commands = not post_build_commands
+    for key, value in read_odevio_file(find_project_file(directory, ".odevio")):
+        if key == "post-build-command":
+            if use_file_commands:
+                post_build_commands.append(value)
+        elif key in options and not options[key]:
+            options[key] = int(value) if key == "build-number" else value
+    if not options["app-key"] or not options["build-type"]:
+        raise click.ClickException(f"app-key and build-type have to be set for {directory}, in its .odevio file or as options")
+    if options["build-type"] == "configuration":
+        raise click.ClickException("Configuration builds can't be started for several projects at once.")
+
+    pubspec = os.path.join(directory, "pubspec.yaml")
+    if (not options["app-version"] or not options["build-number"]) and os.path.exists(pubspec):
+        try:
+            version, build_num = get_version_and_build(pubspec)
+            options["app-version"] = options["app-version"] or version
+            options["build-number"] = options["build-number"] or build_num
+        except Exception as e:
+            raise click.ClickException(f"Error getting version and build number from {pubspec}: {e}")
+
+    return {
+        "application": options["app-key"],
+        "build_type": options["build-type"],
+        "min_sdk": options["minimal-ios-version"],
+        "flutter_version": options["flutter"],
+        "app_version": options["app-version"],
+        "build_number": options["build-number"],
+        "mode": options["mode"],
+        "target": options["target"],
+        "flavor": options["flavor"],
+        "post_build_commands": post_build_commands,
+        **lock_fingerprints(directory, options["flutter"] or latest_flutter_version),
+    }
+
+
+def _start_projects(ctx, projects, options, no_progress=False, output="text", max_wait=None, on_max_wait="refuse"):
+    """ Starts a build for each project directory. The projects are zipped in parallel worker processes and each one
+    is uploaded as soon as it is zipped, then the builds are followed together.
+
+    :param options: options given on the command line, by .odevio parameter name
+    """
+    import os
+    import tempfile
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+    from odevio import api, buildqueue
+    from odevio.helpers import latest_flutter_version
+    from odevio.settings import console
+
+    latest_version = latest_flutter_version()
+    fields = {directory: _project_fields(directory, options, latest_version) for directory in projects}
+    _check_queue_wait(max_wait, on_max_wait)
+
+    builds = []
+    console.print(f"Zipping {len(projects)} projects")
+    with tempfile.TemporaryDirectory() as temp_dir, ProcessPoolExecutor() as packer, ThreadPoolExecutor(max_workers=4) as uploader:
+        with trace.span("package", projects=len(projects)):
+            zips = {packer.submit(buildqueue.package, directory, os.path.join(temp_dir, str(i))): directory
+                    for i, directory in enumerate(projects)}
+            uploads = {}
+            for future in as_completed(zips):
+                directory = zips[future]
+                zip_file = future.result()
+                file_size_mb = round(os.path.getsize(zip_file)/1000000, 2)
+                if file_size_mb > 500:
+                    console.print(f"Zipped size of {directory} exceeds 500MB, very large applications are not supported by Odevio. Make sure that all files and directories not needed to build are listed in .odevioignore")
                     continue
-                if line[-1] == "/":
-                    excluded_dirs.append(line[:-1])
-                else:
-                    excluded_files.append(line)
+                console.print(f"Uploading {directory} ({file_size_mb} MB)")
+                uploads[uploader.submit(_submit_build, fields[directory], zip_file)] = directory
+        for future in as_completed(uploads):
+            build_instance = future.result()
+            if build_instance:
+                console.print(f"[{build_instance['key']}] Build of {uploads[future]} created")
+                builds.append(api.get(f"/builds/{build_instance['key']}/") or build_instance)
+            else:
+                console.print(f"Could not create the build of {uploads[future]}")
+
+    if builds and not no_progress:
+        _follow_builds(ctx, builds, output=output, submitted=True)
+    if output == "ndjson" and len(builds) < len(projects):
+        ctx.exit(1)
+
+
+# The application is part of the fingerprint so the result of a build signed for another bundle ID is never reused
+RESULT_FIELDS = ["source_digest", "application", "build_type", "mode", "flavor", "target", "min_sdk", "app_version",
+                 "build_number", "post_build_commands"]
+
+
+def _result_fingerprint(fields, flutter_version):
+    """ :return the fingerprint of the result of a build: builds with the same fingerprint build the same sources with
+    the same configuration
+    """
+    import hashlib
+
+    config = {field: fields[field] for field in RESULT_FIELDS}
+    config["flutter_version"] = flutter_version
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()
+
+
+def _find_cached_result(fingerprint):
+    """ :return the key of a succeeded build with this result fingerprint, from the history of this computer or else
+    from the API, or None. The API is only searched once the server is known to filter builds on their fingerprint,
+    otherwise the request would return the whole build history.
+    """
+    from odevio import api, history
+    from odevio.helpers import server_supports
+
+    for record in history.list_records():
+        if record.get("result_fingerprint") == fingerprint and record.get("status") == "succeeded":
+            try:
+                b = api.get(f"/builds/{record['key']}/")
+            except api.NotFoundException:  # Removed since
+                continue
+            if b and b['status_code'] == "succeeded":
+                return b['key']
+    if not server_supports("result_fingerprint"):
+        return None
+    try:
+        with trace.span("result lookup"):
+            for page in api.get_pages("/builds/", params={"all": 1, "status": "succeeded", "result_fingerprint": fingerprint}):
+                for b in page:
+                    # Servers that do not filter on the fingerprint return other builds
+                    if b.get("result_fingerprint") == fingerprint:
+                        return b['key']
+    except api.NotFoundException:
+        return None
+    return None
+
+
+def _reuse_result(ctx, key, build_type, output="text", no_tty=False):
+    """ Offers to reuse the result of the succeeded build key instead of building again. With --no-tty or when the
+    input is not a terminal, as in CI, it is reused without asking, like in ndjson.
+
+    :return True if it is reused
+    """
+    from odevio import api
+    from odevio.settings import console
+
+    console.print(f"Build {key} already built the same sources with the same configuration and succeeded. Use --force to build again.")
+    if output == "ndjson":
+        sys.stdout.write(_ndjson_event(key, "reused", None))
+        if build_type == "ad-hoc":
+            response = api.get(f"/builds/{key}/ipa/")
+            if response:
+                sys.stdout.write(_ndjson_event(key, "ipa", response['url']))
+        return True
+    interactive = not no_tty and sys.stdin is not None and sys.stdin.isatty()
+    if interactive and not click.confirm("Do you want to reuse its result instead of building again?", default=True):
+        return False
+    if build_type == "ad-hoc":
+        ctx.invoke(ipa, key=key)
+    else:
+        console.print(f"See its result with odevio build detail {key}")
+    return True
+
+
+@contextmanager
+def _reserve_instance(fields):
+    """ Reserves an instance for a build that is about to be submitted, so it starts while the sources are zipped and
+    uploaded. Yields a dict with the key of the reservation, or without key if the server could not reserve one.
+    Unless "used" is set to True in this dict, the reservation is cancelled when the context is exited, for example
+    if the command is killed with ctrl-C or if the build could not be created.
+    """
+    from odevio import api
+    from odevio.settings import console
+
+    reservation = {}
+    try:
+        with trace.span("reserve instance"):
+            response = api.post("/builds/reservations/", json_data={
+                "application": fields["application"],
+                "build_type": fields["build_type"],
+                "flutter_version": fields["flutter_version"],
+            })
+        if response:
+            reservation["key"] = response["key"]
+            console.print("An instance is starting for this build")
+    except api.NotFoundException:
+        console.print("Instances can't be reserved in advance on this server, the build will start once uploaded.")
+    try:
+        yield reservation
+    finally:
+        if reservation.get("key") and not reservation.get("used"):
+            try:
+                api.delete(f"/builds/reservations/{reservation['key']}/", json_decode=False)
+                console.print("The instance reserved for this build was released")
+            except Exception:  # It expires on its own
+                pass
+
+
+def _submit_uploaded_source(fields):
+    """ Creates a build from sources that were already uploaded for the application, if the server has sources with
+    the digest fields["source_digest"].
+
+    :return the created build instance, or None if the sources have to be uploaded
+    """
+    from odevio import api
+    from odevio.settings import console
+
+    if not fields["application"]:
+        return None
+    try:
+        with trace.span("source lookup"):
+            source = api.get(f"/applications/{fields['application']}/sources/{fields['source_digest']}/")
+    except api.NotFoundException:  # Not uploaded yet, or the server does not keep the sources by digest
+        return None
+    if not source:
+        return None
+    console.print("These sources were already uploaded, starting the build without uploading them again")
+    with trace.span("submit", source_digest=fields["source_digest"]):
+        return api.post("/builds/", json_data=fields) or None
+
+
+def _submit_build(fields, zip_file):
+    """ Uploads a zipped project to create a build.
+
+    :param fields: parameters of the build
+    :return the created build instance, or None if it could not be created
+    """
+    import os
+
+    from odevio import api
+
+    with trace.span("upload", size_mb=round(os.path.getsize(zip_file)/1000000, 2)), open(zip_file, "rb") as source:
+        return api.post(
+            "/builds/",
+            json_data=fields,
+            files={
+                "source": ("source.zip", source, "application/zip")
+            },
+        )
+
+
+def _count_running_builds():
+    """ :return the number of builds queued or in progress on the account and teams, or None if it could not be
+    fetched
+    """
+    from odevio import api
+    from odevio.queuewait import count_running
+
+    try:
+        with trace.span("queue wait estimate"):
+            return count_running(b for page in api.get_pages("/builds/", params={"all": 1}) for b in page)
+    except Exception:  # The estimate is only informative
+        return None
+
+
+def _check_queue_wait(max_wait=None, on_max_wait="refuse", running=None):
+    """ Prints the estimated wait for an instance of a new build. If it exceeds max_wait minutes, exits with an error or
+    waits until it does not, depending on on_max_wait.
+
+    :param running: the number of builds queued or in progress if it was already counted by _count_running_builds
+    :return the number of builds queued or in progress, or None if it could not be fetched
+    """
+    import time
+
+    from odevio.queuewait import estimate
+    from odevio.settings import console
 
-    zip_file = zip_directory(directory, excluded_dirs, excluded_files)
+    while True:
+        if running is None:
+            running = _count_running_builds()
+            if running is None:
+                return None
+        wait = estimate(running)
+        if wait is None:
+            console.print(f"{running} build{'s' if running != 1 else ''} queued or in progress on your account and teams.")
+            return running
+        p50, p95, samples = wait
+        console.print(f"{running} build{'s' if running != 1 else ''} queued or in progress on your account and teams. "
+                      f"Estimated wait for an instance: {_format_duration(p50)} (up to {_format_duration(p95)}), "
+                      f"based on {samples} past build{'s' if samples != 1 else ''}.")
+        if max_wait is None or p50 <= max_wait * 60:
+            return running
+        if on_max_wait == "refuse":
+            raise click.ClickException(f"The estimated wait is longer than --max-wait ({max_wait} min), the build was not submitted.")
+        console.print(f"Waiting for the estimated wait to drop below {max_wait} min before uploading the build...")
+        time.sleep(60)
+        running = None
+
+
+def _watch_build(build_instance, events, submitted=False):
+    """ Follows the event stream of a build and puts its events in the events queue. Run in a thread by watch and
+    build queue run, submitted being True if the build was just created.
+    """
+    from odevio.history import LogWriter
+    from odevio.sse import build_events
+
+    key = build_instance['key']
+    try:
+        with LogWriter(build_instance, submitted=submitted) as log_file:
+            for event, data in build_events(key):
+                if event == "status":
+                    log_file.set_status(data)
+                elif event == "substatus":
+                    log_file.set_substatus(data)
+                elif event == "log":
+                    log_file.write(data)
+                events.put((key, event, data))
+    except Exception as e:
+        events.put((key, "error", str(e)))
+    events.put((key, "end", None))
+
+
+def _format_duration(seconds):
+    seconds = int(seconds)
+    return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+def _watch_table(builds, states):
+    from rich.table import Table
+
+    now = datetime.now().astimezone()
+    table = Table()
+    table.add_column("KEY")
+    table.add_column("App")
+    table.add_column("Name")
+    table.add_column("Build Type")
+    table.add_column("Status")
+    table.add_column("Substatus")
+    table.add_column("Elapsed", justify="right")
+    for b in builds:
+        state = states[b['key']]
+        elapsed = "-"
+        if state["start"]:
+            elapsed = _format_duration(((state["end"] or now) - state["start"]).total_seconds())
+        table.add_row(b['key'], b['application'] or "-", b['name'], b['build_type'], state["status"],
+                      state["substatus"] or "", elapsed)
+    return table
 
-    file_size_mb = round(os.path.getsize(zip_file)/1000000, 2)
 
-    if file_size_mb > 500:
-        console.print("Zipped directory size exceeds 500MB, very large applications are not supported by Odevio. Make sure that all files and directories not needed to build are listed in .odevioignore")
-        os.remove(".app.zip")
+@build.command()
+@login_required_warning_decorator
+@click.argument('keys', nargs=-1)
+@click.option('--all-running', is_flag=True, help="Watch all the builds of your account and teams that are not finished")
+@click.option('--logs', 'show_logs', is_flag=True, help="Also print the logs of the builds, each line prefixed with the key of its build")
+@click.option('--output', type=click.Choice(["text", "ndjson"]), default="text",
+              help="ndjson: write the progress on stdout as one JSON object per event, and exit with code 1 if a build fails. Other messages are written on stderr.")
+@click.pass_context
+def watch(ctx, keys, all_running, show_logs, output):
+    """ Follows the progress of several builds at once.
+
+    KEYS : Keys of the builds to watch.
+    """
+    from odevio import api
+    from odevio.settings import console
+    from odevio.queuewait import is_running
+    from odevio.sse import FINAL_STATUSES
+
+    if output == "ndjson":
+        console.file = sys.stderr
+
+    builds = []
+    try:
+        for key in keys:
+            builds.append(api.get(f"/builds/{key}/"))
+    except api.NotFoundException:
+        console.print(f"Build {key} does not exist or you cannot access it.")
+        return
+    if all_running:
+        # Only the builds that are not finished according to the listing are fetched to get their status
+        listing = (b for page in api.get_pages("/builds/", params={"all": 1}) for b in page)
+        for b in listing:
+            if b['key'] not in keys and is_running(b):
+                b = api.get(f"/builds/{b['key']}/") if "status_code" not in b else b
+                if b["status_code"] not in FINAL_STATUSES:
+                    builds.append(b)
+    builds = [b for b in builds if b]
+    if not builds:
+        console.print("There is no build to watch.")
         return
+    _follow_builds(ctx, builds, show_logs, output)
 
-    # Start build
-    console.print(f"Uploading {directory} ({file_size_mb} MB)")
-    build_instance = api.post(
-        "/builds/",
-        json_data={
-            "application": app_key,
-            "build_type": build_type,
-            "min_sdk": minimal_ios_version,
-            "flutter_version": flutter,
-            "app_version": app_version,
-            "build_number": build_number,
-            "mode": mode,
-            "target": target,
-            "flavor": flavor,
-            "post_build_commands": post_build_commands,
-        },
-        files={
-            "source": ("source.zip", open(".app.zip", "rb"), "application/zip")
-        },
-    )
 
-    os.remove(".app.zip")
+def _follow_builds(ctx, builds, show_logs=False, output="text", submitted=False):
+    """ Follows the progress of several builds at once, in a table or as NDJSON events. In ndjson output, exits with
+    code 1 if a build does not succeed.
 
-    if build_instance:
-        _show_build_progress(ctx, build_instance, tunnel_port, tunnel_host, tunnel_remote_port, no_progress)
+    :param submitted: True if the builds were just created
+    """
+    import queue
+    import threading
+    import time
+
+    from rich.live import Live
+
+    from odevio.logsink import LogSink
+    from odevio.settings import console
+    from odevio.sse import FINAL_STATUSES
+
+    ndjson = output == "ndjson"
+    states = {}
+    events = queue.Queue()
+    for b in builds:
+        states[b['key']] = {
+            "status": b['status_code'],
+            "substatus": b.get('substatus_code'),
+            "start": parse_datetime(b.get('start_time')),
+            "end": None,
+        }
+        if b['status_code'] in FINAL_STATUSES:
+            states[b['key']]["end"] = states[b['key']]["start"]
+            continue
+        threading.Thread(target=_watch_build, args=(b, events, submitted), daemon=True).start()
+    running = sum(1 for state in states.values() if state["end"] is None)
+
+    if ndjson:
+        with LogSink() as sink:
+            for b in builds:
+                sink.write(_ndjson_event(b['key'], "status", b['status_code']))
+            while running:
+                key, event, data = events.get()
+                if event == "end":
+                    running -= 1
+                    continue
+                if event == "status":
+                    states[key]["status"] = data
+                sink.write(_ndjson_event(key, event, data))
+        if any(state["status"] not in ["config", "succeeded"] for state in states.values()):
+            ctx.exit(1)
+        return
+
+    partial_lines = {}
+    last_update = time.monotonic()
+    with Live(_watch_table(builds, states), console=console, refresh_per_second=4) as live, LogSink(console) as sink:
+        while running:
+            if time.monotonic() - last_update > 0.25:
+                live.update(_watch_table(builds, states))
+                last_update = time.monotonic()
+            try:
+                key, event, data = events.get(timeout=0.25)
+            except queue.Empty:
+                continue
+            state = states[key]
+            if event == "status":
+                state["status"] = data
+                if data == "in_progress" and state["start"] is None:
+                    state["start"] = datetime.now().astimezone()
+                if data in FINAL_STATUSES:
+                    state["end"] = datetime.now().astimezone()
+            elif event == "substatus":
+                state["substatus"] = data
+            elif event == "log" and show_logs:
+                lines = (partial_lines.pop(key, "") + data).split("\n")
+                if lines[-1]:
+                    partial_lines[key] = lines[-1]
+                sink.writelines(f"[{key}] {line}\n" for line in lines[:-1])
+            elif event == "cache":
+                sink.write(f"[{key}] Dependency cache {_cache_message(data)}\n")
+            elif event == "error":
+                sink.write(f"[{key}] Error: {data}\n")
+            elif event == "end":
+                running -= 1
+                if state["end"] is None:
+                    state["end"] = datetime.now().astimezone()
+        live.update(_watch_table(builds, states))
+        sink.writelines(f"[{key}] {line}\n" for key, line in partial_lines.items())
+
+
+@build.group('queue')
+def build_queue():
+    """ Queues builds on this computer and starts them a few at a time.
+
+    Starting many builds at once only leaves them waiting for an instance. Instead, add them to the queue with
+    odevio build queue add, then run odevio build queue run: it submits the queued builds as the previous ones finish,
+    with at most --concurrency builds running at a time, and zips the next project while the builds are running.
+    """
+
+
+@build_queue.command('add')
+@click.argument('directory', type=click.Path(exists=True, resolve_path=True, file_okay=False, dir_okay=True),
+                required=False)
+@click.option('--app-key', required=True, help="Key of the application to build")
+@click.option('--build-type', required=True, help="Build type",
+              type=click.Choice(["development", "ad-hoc", "distribution", "validation", "publication"]))
+@click.option('--flutter', help="Flutter version for your build (example \"2.8.1\"). Use odevio build flutter-versions to see all available versions",)
+@click.option('--minimal-ios-version', help="Minimal iOS version for you application (example \"9.0\")")
+@click.option('--app-version', help="App version to set for this build (for example \"1.3.1\"). If not set, the version in pubspec.yaml will be used")
+@click.option('--build-number', type=int, help="Build number to set for this build (the number after '+' in the version in pubspec.yaml). If not set, the build number in pubspec.yaml will be used")
+@click.option('--mode', type=click.Choice(["release", "profile", "debug"]), help="Mode to build the app in. Defaults to release")
+@click.option('--target', help="The main entry-point file of the application. Defaults to lib/main.dart")
+@click.option('--flavor', help="Custom app flavor")
+@click.option('--post-build-command', multiple=True, help="Command to run after the build has finished. Can be specified multiple times.")
+def queue_add(app_key, build_type, flutter, minimal_ios_version, app_version, build_number, mode, target, flavor, post_build_command, directory=None):
+    """ Adds a build to the queue.
+
+    DIRECTORY : Home directory of the flutter project. If not provided, gets the current directory.
+
+    The project is zipped when the build is started by odevio build queue run, excluding the files listed in the
+    .odevioignore file of the project directory.
+    """
+    import os
+
+    from odevio import buildqueue
+    from odevio.helpers import latest_flutter_version, lock_fingerprints
+    from odevio.settings import console
+
+    if directory is None:
+        directory = os.getcwd()
+    if (not app_version or not build_number) and os.path.exists(os.path.join(directory, "pubspec.yaml")):
+        try:
+            version, build_num = get_version_and_build(os.path.join(directory, "pubspec.yaml"))
+            app_version = app_version or version
+            build_number = build_number or build_num
+        except Exception as e:
+            console.stderr("Error getting version and build number from pubspec.yaml: "+str(e))
+
+    item_id = buildqueue.add(buildqueue.connect(), directory, {
+        "application": app_key,
+        "build_type": build_type,
+        "min_sdk": minimal_ios_version,
+        "flutter_version": flutter,
+        "app_version": app_version,
+        "build_number": build_number,
+        "mode": mode,
+        "target": target,
+        "flavor": flavor,
+        "post_build_commands": list(post_build_command),
+        **lock_fingerprints(directory, flutter or latest_flutter_version()),
+    })
+    console.print(f"Build #{item_id} of {directory} added to the queue. Start the queued builds with odevio build queue run.")
+
+
+@build_queue.command('ls')
+def queue_ls():
+    """ Lists the queued builds. """
+    from rich.table import Table
+
+    from odevio import buildqueue
+    from odevio.settings import console
+
+    items = buildqueue.list_items(buildqueue.connect())
+    if not items:
+        console.print("The build queue is empty. Add a build with odevio build queue add.")
+        return
+    table = Table()
+    table.add_column("ID", justify="right")
+    table.add_column("Directory")
+    table.add_column("App")
+    table.add_column("Build Type")
+    table.add_column("Added at")
+    table.add_column("Status")
+    table.add_column("KEY")
+    for item in items:
+        spec = json.loads(item["spec"])
+        table.add_row(str(item["id"]), item["directory"], spec["application"], spec["build_type"],
+                      datetime.fromtimestamp(item["added"]).strftime('%Y-%m-%d %H:%M'),
+                      item["status"] + (f": {item['error']}" if item["error"] else ""), item["build_key"] or "")
+    console.print(table)
+
+
+@build_queue.command('rm')
+@click.argument('ids', nargs=-1, type=int, required=True)
+def queue_rm(ids):
+    """ Removes builds from the queue. Builds that were already submitted are not stopped.
+
+    IDS : IDs of the queued builds, as shown by odevio build queue ls.
+    """
+    from odevio import buildqueue
+    from odevio.settings import console
+
+    connection = buildqueue.connect()
+    for item_id in ids:
+        if buildqueue.remove(connection, item_id):
+            console.print(f"Build #{item_id} removed from the queue.")
+        else:
+            console.print(f"There is no build #{item_id} in the queue.")
+
+
+@build_queue.command('run')
+@login_required_warning_decorator
+@click.option('-c', '--concurrency', type=click.IntRange(min=1), default=1, show_default=True,
+              help="Maximum number of queued builds running at the same time")
+def queue_run(concurrency):
+    """ Starts the queued builds until the queue is empty.
+
+    A build is submitted when fewer than --concurrency of the queued builds are running. The next project is zipped
+    in a separate process while the builds are running, so it can be uploaded as soon as a build finishes. Builds
+    submitted by a previous run that was interrupted are followed again.
+    """
+    import os
+    import tempfile
+    import threading
+    from concurrent.futures import ProcessPoolExecutor
+    from queue import Queue, Empty
+
+    from odevio import api, buildqueue
+    from odevio.settings import console
+    from odevio.sse import FINAL_STATUSES
+
+    connection = buildqueue.connect()
+    events = Queue()
+    running = {}  # queue item id of the running builds by build key
+    statuses = {}
+
+    def follow(build_instance, item_id, submitted):
+        running[build_instance['key']] = item_id
+        statuses[build_instance['key']] = build_instance.get('status_code')
+        threading.Thread(target=_watch_build, args=(build_instance, events, submitted), daemon=True).start()
+
+    for item in buildqueue.list_items(connection):
+        if item["status"] == buildqueue.PACKAGING:  # Interrupted before it was submitted
+            buildqueue.set_status(connection, item["id"], buildqueue.PENDING)
+        elif item["status"] == buildqueue.SUBMITTED:
+            try:
+                build_instance = api.get(f"/builds/{item['build_key']}/")
+            except api.NotFoundException:
+                build_instance = None
+            if not build_instance:
+                buildqueue.set_status(connection, item["id"], buildqueue.ERROR, error="Build not found")
+            elif build_instance['status_code'] in FINAL_STATUSES:
+                buildqueue.set_status(connection, item["id"], build_instance['status_code'])
+            else:
+                console.print(f"[{item['build_key']}] Following build #{item['id']} of {item['directory']}")
+                follow(build_instance, item["id"], False)
+
+    packaging = None  # (item, future) of the project being zipped
+    ready = None  # (item, zip file) of the next build to submit
+    with tempfile.TemporaryDirectory() as temp_dir, ProcessPoolExecutor(max_workers=1) as executor:
+        while True:
+            if packaging is None and ready is None:
+                item = buildqueue.claim_next(connection)
+                if item is not None:
+                    console.print(f"Zipping {item['directory']} for build #{item['id']}")
+                    packaging = item, executor.submit(buildqueue.package, item["directory"],
+                                                      os.path.join(temp_dir, str(item["id"])))
+            if packaging is not None and packaging[1].done():
+                item, future = packaging
+                packaging = None
+                try:
+                    ready = item, future.result()
+                except Exception as e:
+                    console.print(f"Could not zip {item['directory']} for build #{item['id']}: {e}")
+                    buildqueue.set_status(connection, item["id"], buildqueue.ERROR, error=str(e))
+                continue
+            if ready is not None and len(running) < concurrency:
+                item, zip_file = ready
+                ready = None
+                console.print(f"Uploading {item['directory']} for build #{item['id']} ({round(os.path.getsize(zip_file)/1000000, 2)} MB)")
+                try:
+                    build_instance = _submit_build(json.loads(item["spec"]), zip_file)
+                finally:
+                    os.remove(zip_file)
+                if not build_instance:
+                    buildqueue.set_status(connection, item["id"], buildqueue.ERROR, error="The build could not be created")
+                    continue
+                buildqueue.set_status(connection, item["id"], buildqueue.SUBMITTED, build_key=build_instance['key'])
+                console.print(f"[{build_instance['key']}] Build #{item['id']} submitted")
+                follow(api.get(f"/builds/{build_instance['key']}/") or build_instance, item["id"], True)
+                continue
+            if not running and packaging is None and ready is None:
+                break
+
+            try:
+                key, event, data = events.get(timeout=0.25)
+            except Empty:
+                continue
+            if event == "status":
+                statuses[key] = data
+                console.print(f"[{key}] {data}")
+            elif event == "substatus":
+                console.print(f"[{key}] {statuses[key]} - {data}")
+            elif event == "cache":
+                console.print(f"[{key}] Dependency cache {_cache_message(data)}")
+            elif event == "error":
+                console.print(f"[{key}] Error: {data}")
+            elif event == "end":
+                item_id = running.pop(key)
+                if statuses[key] in FINAL_STATUSES:
+                    buildqueue.set_status(connection, item_id, statuses[key])
+                else:  # Stopped following it, the next run will follow it again
+                    console.print(f"[{key}] Lost the progress of build #{item_id}")
+    console.print("The build queue is empty.")
 
 
 @build.command()
@@ -612,7 +1599,7 @@ def ipa(key):
     from rich.text import Text
 
     if key is None:
-        key = terminal_menu("/builds/", "Builds", api_params={"all": 1, "type": "ad-hoc", "status": "succeeded"}, name=build_name,
+        key = terminal_menu("/builds/", "Builds", model=Build, api_params={"all": 1, "type": "ad-hoc", "status": "succeeded"}, name=build_name,
                                     does_not_exist_msg=Text.from_markup(textwrap.dedent(
                                         f"""
                                             You have not run any builds yet.
@@ -652,7 +1639,7 @@ def download(key, output="source.zip"):
     from rich.text import Text
 
     if key is None:
-        key = terminal_menu("/builds/", "Builds", api_params={"all": 1}, name=build_name,
+        key = terminal_menu("/builds/", "Builds", model=Build, api_params={"all": 1}, name=build_name,
                                     does_not_exist_msg=Text.from_markup(textwrap.dedent(
                                         f"""
                                             You have not run any builds yet.
@@ -700,7 +1687,6 @@ def connect(ctx, key, tunnel_port, tunnel_host, tunnel_remote_port, yes):
     .. note:: The connection uses the VNC protocol, your Remote Desktop client must support it to allow you to use an Odevio-Remote.
     """
     import textwrap
-    from datetime import datetime
     from rich.panel import Panel
     from rich.text import Text
 
@@ -710,7 +1696,7 @@ def connect(ctx, key, tunnel_port, tunnel_host, tunnel_remote_port, yes):
     from rich.syntax import Syntax
 
     if key is None:
-        key = terminal_menu("/builds/", "Builds", name=build_name,
+        key = terminal_menu("/builds/", "Builds", model=Build, name=build_name,
                                     does_not_exist_msg=Text.from_markup(textwrap.dedent(
                                         f"""
                                             You have not run any builds yet.
@@ -756,12 +1742,8 @@ def connect(ctx, key, tunnel_port, tunnel_host, tunnel_remote_port, yes):
                     )
                 ), title="Connection settings and credentials", expand=False)
                 console.print(auth_info)
-                build_instance['stop_time'] = build_instance['stop_time'][:-3] + build_instance['stop_time'][-2:]  # Remove timezone ':' otherwise it can't parse
-                try:
-                    stop_time = datetime.strptime(build_instance["stop_time"], "%Y-%m-%dT%H:%M:%S.%f%z").astimezone()
-                except ValueError:
-                    stop_time = datetime.strptime(build_instance["stop_time"], "%Y-%m-%dT%H:%M:%S%z").astimezone()
-                console.print("Your machine will automatically stop at "+stop_time.strftime("%H:%M")+", but remember to stop it as soon as you are finished to free up resources by typing")
+                stop_time = parse_datetime(build_instance["stop_time"])
+                console.print("Your machine will automatically stop at "+format_datetime(stop_time, "%H:%M")+", but remember to stop it as soon as you are finished to free up resources by typing")
                 console.print(Syntax(code="odevio build stop "+key, lexer="shell"))
                 console.print("")
                 console.print("Most Remote Desktop applications link the Mac Command key to the Windows key on your keyboard.")
@@ -794,7 +1776,7 @@ def patch(key, output="odevio.patch"):
     from rich.text import Text
 
     if key is None:
-        key = terminal_menu("/builds/", "Builds", name=build_name, api_params={"all": 1},
+        key = terminal_menu("/builds/", "Builds", model=Build, name=build_name, api_params={"all": 1},
                                     does_not_exist_msg=Text.from_markup(textwrap.dedent(
                                         f"""
                                             You have not run any builds yet.
@@ -836,7 +1818,7 @@ def stop(key):
     from rich.text import Text
 
     if key is None:
-        key = terminal_menu("/builds/", "Builds", name=build_name,
+        key = terminal_menu("/builds/", "Builds", model=Build, name=build_name,
                                     does_not_exist_msg=Text.from_markup(textwrap.dedent(
                                         f"""
                                             You do not have any running builds.
@@ -860,9 +1842,148 @@ def stop(key):
 @build.command()
 @login_required_warning_decorator
 @click.argument('key', required=False)
-def logs(key):
+@click.option('--build-type', help="Build type, instead of the one of the previous build",
+              type=click.Choice(["configuration", "development", "ad-hoc", "distribution", "validation", "publication"]))
+@click.option('--flutter', help="Flutter version, instead of the one of the previous build (example \"2.8.1\")")
+@click.option('--mode', type=click.Choice(["release", "profile", "debug"]), help="Mode to build the app in, instead of the one of the previous build")
+@click.option('--flavor', help="Custom app flavor, instead of the one of the previous build")
+@click.option('--build-number', type=int, help="Build number, instead of the one of the previous build")
+@click.option('--no-progress', is_flag=True, help="Do not display the progress and exit the command immediately.")
+@click.option('--no-tty', is_flag=True, help="Display the progress as plain text lines instead of a spinner, for logs and CI.")
+@click.option('--output', type=click.Choice(["text", "ndjson"]), default="text",
+              help="ndjson: write the progress on stdout as one JSON object per event, and exit with code 1 if the build fails. Other messages are written on stderr.")
+@click.pass_context
+def rebuild(ctx, key, build_type, flutter, mode, flavor, build_number, no_progress, no_tty, output):
+    """ Starts a new build from the sources of a previous build, without uploading them again.
+
+    The new build has the same parameters as the previous one, except the ones given as options. Use it to retry a
+    build that failed for a temporary reason, or to try another Flutter version.
+    """
+    import textwrap
+
+    from odevio import api
+    from odevio.helpers import terminal_menu
+    from odevio.settings import console
+    from rich.text import Text
+
+    if output == "ndjson":
+        console.file = sys.stderr
+
+    if key is None:
+        key = terminal_menu("/builds/", "Builds", model=Build, name=build_name, api_params={"all": 1},
+                                    does_not_exist_msg=Text.from_markup(textwrap.dedent(
+                                        f"""
+                                            You have not run any builds yet.
+                                        """
+                                    )))
+        if key is None:
+            return
+
+    overrides = {
+        "build_type": build_type,
+        "flutter_version": flutter,
+        "mode": mode,
+        "flavor": flavor,
+        "build_number": build_number,
+    }
+    try:
+        rebuild_instance = api.post(f"/builds/{key}/rebuild/",
+                                    json_data={field: value for field, value in overrides.items() if value is not None})
+    except api.NotFoundException:
+        console.print("This build does not exist or you cannot access it.")
+        if output == "ndjson":
+            ctx.exit(1)
+        return
+
+    if rebuild_instance:
+        succeeded = _show_build_progress(ctx, rebuild_instance, no_progress=no_progress, no_tty=no_tty, output=output)
+        if output == "ndjson" and not no_progress and not succeeded:
+            ctx.exit(1)
+    elif output == "ndjson":
+        ctx.exit(1)
+
+
+def _fetch_logs(key, offset=0, tail=None):
+    """ Downloads the logs of a build, from offset bytes and/or only the last tail lines.
+
+    :return a (logs, end offset) tuple
+    """
+    from odevio import api
+
+    params = {}
+    if offset:
+        params["offset"] = offset
+    if tail is not None:
+        params["tail"] = tail
+    logs = api.get(f"/builds/{key}/logs/", params=params or None)
+    if isinstance(logs, dict):  # The server applied the offset and tail
+        return logs["content"], logs.get("size", offset + len(logs["content"].encode()))
+    data = (logs or "").encode()
+    end = len(data)
+    data = data[offset:]
+    if tail is not None:
+        data = b"".join(data.splitlines(keepends=True)[-tail:]) if tail else b""
+    return data.decode(errors="replace"), end
+
+
+def _follow_logs(key, offset, raw):
+    """ Prints the logs of a running build as they arrive, starting at offset bytes. """
+    from odevio import api
+    from odevio.logsink import LogSink
+    from odevio.settings import console
+    from odevio.sse import build_events, FINAL_STATUSES
+
+    if api.get(f"/builds/{key}/")["status_code"] in FINAL_STATUSES:
+        return
+    skip = offset
+    with LogSink(None if raw else console) as sink:
+        for event, data in build_events(key):
+            if event != "log":
+                continue
+            if skip:
+                encoded = data.encode()
+                if skip >= len(encoded):
+                    skip -= len(encoded)
+                    continue
+                data = encoded[skip:].decode(errors="replace")
+                skip = 0
+            sink.write(data)
+
+
+def _grep_logs(keys, patterns, ignore_case, prefix=False):
+    """ Prints the lines of the local logs of the builds matching any of the patterns. """
+    from odevio.logsearch import search
+    from odevio.settings import console
+
+    found = False
+    for key, matches in search(keys, patterns, ignore_case):
+        for line in matches:
+            click.echo(f"{key}: {line}" if prefix else line)
+        found = found or bool(matches)
+    if not found and prefix:
+        console.print(f"No match in the logs of the {len(keys)} builds saved on this computer.")
+
+
+@build.command()
+@login_required_warning_decorator
+@click.argument('key', required=False)
+@click.option('-n', '--tail', type=click.IntRange(min=0), help="Only output the last N lines")
+@click.option('--since-offset', type=click.IntRange(min=0), default=0,
+              help="Only output the logs after this position in bytes, for example the size of a file the logs were already saved in with --raw")
+@click.option('-f', '--follow', is_flag=True, help="Keep printing the logs as they arrive until the build is finished")
+@click.option('--raw', is_flag=True, help="Output the logs as they are, without formatting")
+@click.option('--grep', 'patterns', multiple=True, metavar="PATTERN",
+              help="Only output the lines matching this regular expression. Can be specified multiple times to match any of them")
+@click.option('-i', '--ignore-case', is_flag=True, help="With --grep, ignore case distinctions")
+@click.option('-a', '--all', 'all_builds', is_flag=True, help="With --grep, search the logs of all the builds saved on this computer")
+def logs(key, tail, since_offset, follow, raw, patterns, ignore_case, all_builds):
     """ Outputs the logs of a build
 
+    The logs of builds that were followed until the end on this computer are read from a local copy.
+
+    Use --grep with --all to find which of the builds saved on this computer hit an error, for example:
+    odevio build logs --all --grep "CocoaPods could not find" --grep "error: No profiles"
+
     \f
     .. note:: Logs are printed only when a command has finished its execution. In particular, Flutter logs are only printed when the flutter command execution has ended.
     """
@@ -870,11 +1991,19 @@ def logs(key):
 
     from odevio import api
     from odevio.helpers import terminal_menu
+    from odevio.history import read_log, list_records, is_complete
+    from odevio.logsearch import compile_patterns
     from odevio.settings import console
     from rich.text import Text
 
+    if all_builds and not patterns:
+        raise click.UsageError("--all requires --grep")
+    if all_builds:
+        _grep_logs([record["key"] for record in list_records()], patterns, ignore_case, prefix=True)
+        return
+
     if key is None:
-        key = terminal_menu("/builds/", "Builds", name=build_name, api_params={"all": 1},
+        key = terminal_menu("/builds/", "Builds", model=Build, name=build_name, api_params={"all": 1},
                                     does_not_exist_msg=Text.from_markup(textwrap.dedent(
                                         f"""
                                             You have not run any builds yet.
@@ -884,27 +2013,89 @@ def logs(key):
             return
 
     try:
-        logs = api.get(f"/builds/{key}/logs/")
-        console.print(logs)
+        if patterns:
+            if not is_complete(key):
+                regex = compile_patterns(patterns, ignore_case)
+                for line in _fetch_logs(key)[0].splitlines():
+                    if regex.search(line):
+                        click.echo(line)
+            else:
+                _grep_logs([key], patterns, ignore_case)
+            return
+
+        local = read_log(key, since_offset, tail)
+        if local is None:  # Not watched until the end by this computer
+            logs, end = _fetch_logs(key, since_offset, tail)
+        else:
+            logs, end = local
+        if raw:
+            sys.stdout.write(logs)
+            sys.stdout.flush()
+        elif logs:
+            console.print(logs)
+        if follow and local is None:
+            _follow_logs(key, max(end, since_offset), raw)
     except api.NotFoundException:
         console.print("This build does not exist or you cannot access it.")
 
 
-def build_name(build_instance):
-    """ Based on a build instance returns a user friendly name for the build. """
-    from datetime import datetime
+@build.command()
+@click.option('--app', help="Only include the builds of this application")
+@click.option('--build-type', type=click.Choice(["configuration", "development", "ad-hoc", "distribution", "validation", "publication"]),
+              help="Only include the builds of this type")
+@click.option('--flutter', help="Only include the builds with this Flutter version")
+def stats(app, build_type, flutter):
+    """ Shows how long builds spend in each phase.
+
+    The durations are measured on the builds watched on this computer, from the time each phase started to the time the
+    next one started, and show whether the time of the builds goes to the queue, to the start of the instances or to
+    the build itself.
+    """
+    from rich.table import Table
 
-    if "start_time" in build_instance and build_instance["start_time"]:
-        build_instance['start_time'] = build_instance['start_time'][:-3]+build_instance['start_time'][-2:]  # Remove timezone ':' otherwise it can't parse
-        try:
-            start_time = datetime.strptime(build_instance['start_time'], "%Y-%m-%dT%H:%M:%S.%f%z").astimezone()
-        except ValueError:
-            start_time = datetime.strptime(build_instance['start_time'], "%Y-%m-%dT%H:%M:%S%z").astimezone()
-        start_time_str = start_time.strftime('%Y-%m-%d %H:%M')
-    else:
-        start_time_str = "Not started"
+    from odevio.history import PHASES, list_records, phase_durations
+    from odevio.queuewait import percentile
+    from odevio.settings import console
+
+    durations = {phase: [] for phase in PHASES}
+    builds = 0
+    for record in list_records():
+        if app and (record.get("application") or "").lower() != app.lower():
+            continue
+        if build_type and record.get("build_type") != build_type:
+            continue
+        if flutter and record.get("flutter_version") != flutter:
+            continue
+        phases = phase_durations(record)
+        if phases:
+            builds += 1
+        for phase, seconds in phases.items():
+            durations[phase].append(seconds)
+
+    if not builds:
+        console.print("No timings were recorded for these builds. Timings are recorded when builds are followed with "
+                      "odevio build start or odevio build watch.")
+        return
+
+    table = Table(title=f"Phase durations of {builds} build{'s' if builds > 1 else ''}")
+    table.add_column("Phase")
+    table.add_column("Builds", justify="right")
+    table.add_column("p50", justify="right")
+    table.add_column("p95", justify="right")
+    table.add_column("Max", justify="right")
+    for phase in PHASES:
+        values = sorted(durations[phase])
+        if values:
+            table.add_row(phase, str(len(values)), _format_duration(percentile(values, 50)),
+                          _format_duration(percentile(values, 95)), _format_duration(values[-1]))
+    console.print(table)
+
+
+def build_name(build_instance):
+    """ Based on a Build returns a user friendly name for the build. """
+    start_time_str = format_datetime(build_instance.start_time, default="Not started")
 
-    return f"{build_instance['application'] if build_instance['application'] else 'No application'} - {build_instance['name']} - {build_instance['build_type']} - {start_time_str} ({build_instance['key']}) - {build_instance['status']}"
+    return f"{build_instance.application if build_instance.application else 'No application'} - {build_instance.name} - {build_instance.build_type} - {start_time_str} ({build_instance.key}) - {build_instance.status}"
 
 
 @build.command()
@@ -960,7 +2151,7 @@ def tunnel(key, port, remote_port, host):
     if host is None:
         host = "localhost"
     if key is None:
-        key = terminal_menu("/builds/", "Builds", name=build_name,
+        key = terminal_menu("/builds/", "Builds", model=Build, name=build_name,
                             does_not_exist_msg=Text.from_markup(textwrap.dedent(
                                 f"""
                                     You have not run any builds yet.
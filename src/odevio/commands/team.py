@@ -1,6 +1,7 @@
 import click
 
 from odevio.helpers import login_required_warning_decorator
+from odevio.models import Team
 
 
 @click.group('team')
@@ -51,26 +52,26 @@ def ls():
     from odevio import api
     from odevio.settings import console
 
-    teams = api.get("/teams/")
+    teams = [Team.from_api(t) for t in api.get("/teams/") or []]
 
     if teams:
         tree = Tree("My teams")
         for team_instance in teams:
-            t_team = tree.add(f"{team_instance.get('key')} [purple]{team_instance.get('name')}[/purple]")
-            t_team.add(f"Admin username : [green]{team_instance['manager']['username']}[/green]")
-            t_team.add(f"Admin email : [green]{team_instance['manager']['email']}[/green]")
+            t_team = tree.add(f"{team_instance.key} [purple]{team_instance.name}[/purple]")
+            t_team.add(f"Admin username : [green]{team_instance.manager_username}[/green]")
+            t_team.add(f"Admin email : [green]{team_instance.manager_email}[/green]")
             t_team_members = t_team.add('Members')
-            for member_item in team_instance['members']:
+            for member_item in team_instance.members:
                 t_team_members.add(f"[green]{member_item}[/green]")
-            if len(team_instance['applications']) > 0:
+            if len(team_instance.applications) > 0:
                 t_team_apps = t_team.add('Applications')
-                for team_item in team_instance['applications']:
-                    t_team_apps.add(f"[green]{team_item['key']}[/green] | {team_item['name']} | "
-                                    f"{team_item['bundle_id']}")
-            if len(team_instance['apple_developer_accounts']) > 0:
+                for team_item in team_instance.applications:
+                    t_team_apps.add(f"[green]{team_item.key}[/green] | {team_item.name} | "
+                                    f"{team_item.bundle_id}")
+            if len(team_instance.apple_developer_accounts) > 0:
                 t_team_acc = t_team.add('Apple Developer Accounts')
-                for acc_item in team_instance['apple_developer_accounts']:
-                    t_team_acc.add(f"[green]{acc_item['key']}[/green] | {acc_item['name']} | {acc_item['manager']}")
+                for acc_item in team_instance.apple_developer_accounts:
+                    t_team_acc.add(f"[green]{acc_item.key}[/green] | {acc_item.name} | {acc_item.manager}")
         console.print(tree)
     else:
         code = Syntax(code="$ odevio team mk --name TEAM_NAME", lexer="shell")
@@ -105,7 +106,7 @@ def rm(key):
     from odevio.helpers import terminal_menu
 
     if key is None:
-        key = terminal_menu("/teams/?me=1", "Team",
+        key = terminal_menu("/teams/?me=1", "Team", model=Team,
                             does_not_exist_msg="You are not the manager of any team.")
         if key is None:
             return
@@ -135,7 +136,7 @@ def add_member(key, username):
     from odevio.helpers import terminal_menu
 
     if key is None:
-        key = terminal_menu("/teams/", "Team",
+        key = terminal_menu("/teams/", "Team", model=Team,
                             does_not_exist_msg="You are not part of any team.")
         if key is None:
             return
@@ -168,7 +169,7 @@ def rm_member(key, username):
     from odevio.helpers import terminal_menu
 
     if key is None:
-        key = terminal_menu("/teams/", "Team",
+        key = terminal_menu("/teams/", "Team", model=Team,
                             does_not_exist_msg="You are not part of any team.")
         if key is None:
             return
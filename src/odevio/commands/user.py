@@ -1,6 +1,7 @@
 import click
 
 from odevio.helpers import login_required_warning_decorator, terminal_menu
+from odevio.models import ApiKey, Team
 
 
 @click.command()
@@ -95,7 +96,7 @@ def profile(ini):
     from odevio.settings import console, get_config_path
 
     user = api.get("/my-account/")
-    teams = api.get("/teams/")
+    teams = [Team.from_api(t) for t in api.get("/teams/") or []]
 
     if user:
         config_path = f"<[bold purple]{get_config_path()}[/bold purple]>" if ini else f"<{get_config_path()}>"
@@ -112,9 +113,9 @@ def profile(ini):
             table_teams.add_column("Name")
             table_teams.add_column("Admin")
             for team in teams:
-                admin = f"{team['manager']['username']} <[italic]{team['manager']['email']}[/italic]>"
-                table_teams.add_row(team['name'], Text.from_markup(
-                    f"[green bold]{admin}[/green bold]" if team["manager"]["username"] == user["username"] else admin))
+                admin = f"{team.manager_username} <[italic]{team.manager_email}[/italic]>"
+                table_teams.add_row(team.name, Text.from_markup(
+                    f"[green bold]{admin}[/green bold]" if team.manager_username == user["username"] else admin))
             console.print(table_teams)
 
         # TODO add a change password option on this command
@@ -147,12 +148,12 @@ def ls():
     from odevio import api
     from odevio.settings import console
 
-    apikeys = api.get("/apikeys/")
+    apikeys = [ApiKey.from_api(k) for k in api.get("/apikeys/") or []]
     if len(apikeys) > 0:
         table_apikeys = Table(expand=True, title="API keys")
         table_apikeys.add_column("First 8 characters of the key")
         for apikey in apikeys:
-            table_apikeys.add_row(apikey)
+            table_apikeys.add_row(apikey.key)
         console.print(table_apikeys)
     else:
         console.print("You have no API keys")
@@ -171,7 +172,10 @@ def new():
     from odevio.settings import console
 
     apikey = api.post("/apikeys/new")
-    console.print(f"API key: [bold]{apikey['key']}[/bold]")
+    if not apikey:
+        return
+    apikey = ApiKey.from_api(apikey)
+    console.print(f"API key: [bold]{apikey.key}[/bold]")
     console.print("This key will only be shown once so be sure to copy it.")
 
 
@@ -189,8 +193,8 @@ def rm(key):
     from odevio.settings import console
 
     if key is None:
-        key = terminal_menu("/apikeys/", "Which key do you want to delete?", name=lambda apikey: apikey,
-                            does_not_exist_msg="You have no API keys", key_fieldname=None)
+        key = terminal_menu("/apikeys/", "Which key do you want to delete?", model=ApiKey, name=lambda apikey: apikey.key,
+                            does_not_exist_msg="You have no API keys")
         if key is None:
             return
 
@@ -0,0 +1,52 @@
+#                                   #
+#   Build failures classification   #
+#                                   #
+import re
+
+# (name, description, pattern) of known causes of failure, matched on the logs while they are streamed
+RULES = [
+    ("signing", "Code signing failed. Check the certificates of your Apple Developer account with odevio apple detail.",
+     r"No signing certificate|Code ?Sign(?:ing)? error|errSecInternalComponent|requires a development team"
+     r"|No certificate for team"),
+    ("provisioning", "No valid provisioning profile was found. Check the bundle ID of the app and the devices of your Apple Developer account.",
+     r"No profiles? for '[^']*' (?:were|was) found|[Pp]rovisioning profile \"?[^\n]*\"? (?:doesn't|does not|has expired)"
+     r"|requires a provisioning profile"),
+    ("pod_install", "CocoaPods could not install the iOS dependencies. Check ios/Podfile and the minimal iOS version of the build.",
+     r"CocoaPods could not find compatible versions|Error running pod install|pod install` failed"
+     r"|CocoaPods's specs repository is too out-of-date"),
+    ("dart_compile", "The Dart code does not compile. Check that it builds locally with the Flutter version of the build.",
+     r"Error: Compilation failed|\.dart:\d+:\d+: Error:|Target kernel_snapshot failed|Dart compiler exited unexpectedly"),
+    ("out_of_memory", "The build ran out of memory.",
+     r"[Oo]ut of memory|OutOfMemoryError|Cannot allocate memory|Exhausted heap space|Killed: 9"),
+]
+
+_regex = re.compile("|".join(f"(?P<{name}>{pattern})" for name, description, pattern in RULES))
+_descriptions = {name: description for name, description, pattern in RULES}
+
+
+class FailureClassifier:
+    """ Matches the logs of a build against the known causes of failure as they are streamed.
+
+    All the rules are compiled in a single regex so each chunk of logs is scanned once.
+    """
+
+    def __init__(self):
+        self.causes = []  # (name, description, log line) of the causes found, in order
+        self._found = set()
+
+    def feed(self, text):
+        """ :return the (name, description, log line) of the causes found for the first time in text """
+        new_causes = []
+        if len(self._found) == len(RULES):
+            return new_causes
+        for match in _regex.finditer(text):
+            name = match.lastgroup
+            if name in self._found:
+                continue
+            self._found.add(name)
+            start = text.rfind("\n", 0, match.start()) + 1
+            end = text.find("\n", match.end())
+            cause = (name, _descriptions[name], text[start:end if end != -1 else len(text)].strip())
+            self.causes.append(cause)
+            new_causes.append(cause)
+        return new_causes
@@ -1,5 +1,6 @@
 import io
 import os
+import re
 import time
 from configparser import ConfigParser
 from functools import update_wrapper
@@ -11,12 +12,125 @@ import threading
 import qrcode
 import requests
 
-from odevio.settings import console, get_jwt_token, get_config_path, APP_NAME
+from odevio.settings import console, get_jwt_token, get_config_path, APP_NAME, config_lock, save_config
 
 
-def zip_directory(directory_path, excluded_dirs, excluded_files):
-    """ Archives a directory in a zip file and returns its name."""
-    return make_zip(os.path.join(os.getcwd(), '.app'), directory_path, excluded_dirs+["build", "windows", "linux", ".dart_tool", ".pub-cache", ".pub", ".git", ".gradle"], excluded_files+["source.zip", ".app.zip", "odevio.patch"])
+EXCLUDED_DIRS = ["build", "windows", "linux", ".dart_tool", ".pub-cache", ".pub", ".git", ".gradle"]
+EXCLUDED_FILES = ["source.zip", ".app.zip", "odevio.patch"]
+
+
+def zip_directory(directory_path, excluded_dirs, excluded_files, base_name=None, cancelled=None):
+    """ Archives a directory in a zip file and returns its name.
+
+    The zip file is base_name + ".zip", by default .app.zip in the current directory. If the cancelled event is set,
+    it stops and raises click.Abort.
+    """
+    if base_name is None:
+        base_name = os.path.join(os.getcwd(), '.app')
+    return make_zip(base_name, directory_path, excluded_dirs+EXCLUDED_DIRS, excluded_files+EXCLUDED_FILES, cancelled=cancelled)
+
+
+def source_digest(directory_path, excluded_dirs, excluded_files, cancelled=None):
+    """ Computes a digest of the files zip_directory would archive.
+
+    It only depends on the paths and contents of the files, not on their dates or on the order they are listed in, so
+    the same sources always have the same digest. If the cancelled event is set, it stops and raises click.Abort.
+
+    :return the hexadecimal SHA-256 digest
+    """
+    import hashlib
+
+    excluded_dirs = excluded_dirs + EXCLUDED_DIRS
+    excluded_files = excluded_files + EXCLUDED_FILES
+    paths = []
+    for dirpath, dirnames, filenames in os.walk(directory_path, topdown=True):
+        dirnames[:] = [d for d in dirnames if d not in excluded_dirs]
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            if name not in excluded_files and os.path.isfile(path):
+                paths.append((os.path.relpath(path, directory_path).replace(os.sep, "/"), path))
+    digest = hashlib.sha256()
+    for relative_path, path in sorted(paths):
+        if cancelled is not None and cancelled.is_set():
+            raise click.Abort()
+        digest.update(relative_path.encode("utf-8") + b"\0" + str(os.path.getsize(path)).encode() + b"\0")
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024*1024), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+LOCK_FILES = {"pub": "pubspec.lock", "pod": os.path.join("ios", "Podfile.lock")}
+
+
+def lock_fingerprints(directory_path, flutter_version):
+    """ Fingerprints the dependencies of a project so the build machine can restore the caches of a previous build
+    with the same dependencies.
+
+    :return a dict of {name}_cache_key fields with the SHA-256 of the Flutter version and of each lock file of the
+    project, without the lock files that do not exist
+    """
+    import hashlib
+
+    fingerprints = {}
+    for name, lock_file in LOCK_FILES.items():
+        path = os.path.join(directory_path, lock_file)
+        if not os.path.isfile(path):
+            continue
+        digest = hashlib.sha256(f"flutter={flutter_version}\n".encode())
+        with open(path, "rb") as f:
+            digest.update(f.read())
+        fingerprints[f"{name}_cache_key"] = digest.hexdigest()
+    return fingerprints
+
+
+def find_project_file(directory, name):
+    """ :return the path of a configuration file (.odevio or .odevioignore) of the project in directory, or of the
+    one in the current directory if the project has none
+    """
+    path = os.path.join(directory, name)
+    return path if os.path.isfile(path) else name
+
+
+def read_odevio_file(path):
+    """ Reads a .odevio file, where each line is a parameter in the form KEY=VALUE.
+
+    :return a list of (key, value) tuples in the order of the file, which is empty if the file does not exist
+    """
+    options = []
+    if not os.path.isfile(path):
+        return options
+    with open(path) as config:
+        for i, line in enumerate(config.readlines()):
+            split = line.split("=")
+            if len(split) != 2:
+                print("Error in .odevio file line "+str(i+1)+": should be KEY=VALUE")
+                continue
+            key = split[0].strip()
+            if key[0] == "#":  # Ignore commented lines
+                continue
+            options.append((key, split[1].strip()))
+    return options
+
+
+def read_ignore_file(path):
+    """ Reads a .odevioignore file.
+
+    :return the lists of (excluded directories, excluded files), which are empty if the file does not exist
+    """
+    excluded_dirs = []
+    excluded_files = []
+    if os.path.isfile(path):
+        with open(path) as ignore:
+            for line in ignore.readlines():
+                line = line.strip()
+                if line == "":
+                    continue
+                if line[-1] == "/":
+                    excluded_dirs.append(line[:-1])
+                else:
+                    excluded_files.append(line)
+    return excluded_dirs, excluded_files
 
 
 
@@ -61,27 +175,31 @@ def login_required_warning_decorator(f):
     return update_wrapper(run, f)
 
 
-def terminal_menu(api_route, prompt_text, api_params=None, key_fieldname="key", name=lambda a: f"{a['name']} ({a['key']})", does_not_exist_msg="No item to select.", extra_options=[]):
+def terminal_menu(api_route, prompt_text, api_params=None, key_fieldname="key", name=None, does_not_exist_msg="No item to select.", extra_options=[], model=None):
     """ A simple helper function to have a select terminal menu.
 
     Ideally this function should be integrated in a custom click.option and click.argument but it is not easy.
+
+    If model is a class of odevio.models, the items and extra options are loaded as instances of it, which are passed
+    to name, and key_fieldname is an attribute.
     """
     import questionary
     from questionary import Choice
 
     from odevio import api
 
-    if api_params:
-        item_list = api.get(api_route, params=api_params)
-    else:
-        item_list = api.get(api_route)
+    item_list = [item for page in api.get_pages(api_route, params=api_params or None) for item in page]
     item_list.extend(extra_options)
+    if model is not None:
+        item_list = [model.from_api(item) for item in item_list]
+    if name is None:
+        name = (lambda a: f"{a.name} ({a.key})") if model is not None else (lambda a: f"{a['name']} ({a['key']})")
     terminal_ready_list = [Choice(name(item), i) for i, item in enumerate(item_list)]
     if len(terminal_ready_list) == 0:
         console.print(does_not_exist_msg)
         return
     elif len(terminal_ready_list) == 1:
-        value = item_list[0][key_fieldname] if key_fieldname else item_list[0]
+        item = item_list[0]
     else:
         menu_entry_index = questionary.select(
             prompt_text,
@@ -91,17 +209,21 @@ def terminal_menu(api_route, prompt_text, api_params=None, key_fieldname="key",
         if menu_entry_index is None:  # When ctrl-C, exit
             exit()
 
-        value = item_list[menu_entry_index][key_fieldname] if key_fieldname else item_list[menu_entry_index]
+        item = item_list[menu_entry_index]
 
-    return value
+    if not key_fieldname:
+        return item
+    return getattr(item, key_fieldname) if model is not None else item[key_fieldname]
 
 
 ### Copied from shutil to add directory exlusion
-def _make_zipfile(base_name, base_dir, exclude_dir=None, exclude_files=None, verbose=0, dry_run=0, logger=None):
+def _make_zipfile(base_name, base_dir, exclude_dir=None, exclude_files=None, verbose=0, dry_run=0, logger=None,
+                  root_dir=None, cancelled=None):
     """Create a zip file from all the files under 'base_dir'.
 
     The output zip file will be named 'base_name' + ".zip".  Returns the
-    name of the output zip file.
+    name of the output zip file. 'base_dir' is relative to 'root_dir', which
+    defaults to the current directory.
     """
     import zipfile  # late import for breaking circular dependency
 
@@ -118,28 +240,34 @@ def _make_zipfile(base_name, base_dir, exclude_dir=None, exclude_files=None, ver
         logger.info("creating '%s' and adding '%s' to it",
                     zip_filename, base_dir)
 
+    if root_dir is None:
+        root_dir = os.curdir
+
     if not dry_run:
         with zipfile.ZipFile(zip_filename, "w",
                              compression=zipfile.ZIP_DEFLATED) as zf:
             path = os.path.normpath(base_dir)
             if path != os.curdir:
-                zf.write(path, path)
+                zf.write(os.path.join(root_dir, path), path)
                 if logger is not None:
                     logger.info("adding '%s'", path)
-            for dirpath, dirnames, filenames in os.walk(base_dir, topdown=True):
+            for dirpath, dirnames, filenames in os.walk(os.path.join(root_dir, base_dir), topdown=True):
+                reldir = os.path.relpath(dirpath, root_dir)
                 if exclude_dir is not None:
                     dirnames[:] = [d for d in dirnames if d not in exclude_dir]
                 for name in sorted(dirnames):
-                    path = os.path.normpath(os.path.join(dirpath, name))
-                    zf.write(path, path)
+                    path = os.path.normpath(os.path.join(reldir, name))
+                    zf.write(os.path.join(dirpath, name), path)
                     if logger is not None:
                         logger.info("adding '%s'", path)
                 for name in filenames:
+                    if cancelled is not None and cancelled.is_set():
+                        raise click.Abort()
                     if exclude_files is not None and name in exclude_files:
                         continue
-                    path = os.path.normpath(os.path.join(dirpath, name))
-                    if os.path.isfile(path):
-                        zf.write(path, path)
+                    path = os.path.normpath(os.path.join(reldir, name))
+                    if os.path.isfile(os.path.join(dirpath, name)):
+                        zf.write(os.path.join(dirpath, name), path)
                         if logger is not None:
                             logger.info("adding '%s'", path)
 
@@ -147,41 +275,31 @@ def _make_zipfile(base_name, base_dir, exclude_dir=None, exclude_files=None, ver
 
 
 def make_zip(base_name, root_dir=None, exclude_dir=None, exclude_files=None, base_dir=None, verbose=0,
-                 dry_run=0, logger=None):
+                 dry_run=0, logger=None, cancelled=None):
     """Create a zip archive file
 
     'base_name' is the name of the file to create, minus any format-specific
     extension.
 
     'root_dir' is a directory that will be the root directory of the
-    archive; ie. we typically chdir into 'root_dir' before creating the
     archive.  'base_dir' is the directory where we start archiving from;
     ie. 'base_dir' will be the common prefix of all files and
     directories in the archive.  'root_dir' and 'base_dir' both default
     to the current directory.  Returns the name of the archive file.
+
+    Unlike shutil, the current directory is not changed, so several
+    archives can be created at the same time. If the 'cancelled' event is
+    set, it stops and raises click.Abort.
     """
-    save_cwd = os.getcwd()
     if root_dir is not None:
-        if logger is not None:
-            logger.debug("changing into '%s'", root_dir)
         base_name = os.path.abspath(base_name)
-        if not dry_run:
-            os.chdir(root_dir)
 
     if base_dir is None:
         base_dir = os.curdir
 
-    kwargs = {'dry_run': dry_run, 'logger': logger}
+    kwargs = {'dry_run': dry_run, 'logger': logger, 'root_dir': root_dir, 'cancelled': cancelled}
 
-    try:
-        filename = _make_zipfile(base_name, base_dir, exclude_dir, exclude_files, **kwargs)
-    finally:
-        if root_dir is not None:
-            if logger is not None:
-                logger.debug("changing back to '%s'", save_cwd)
-            os.chdir(save_cwd)
-
-    return filename
+    return _make_zipfile(base_name, base_dir, exclude_dir, exclude_files, **kwargs)
 
 
 def tunnel_handler(chan, host, port):
@@ -270,6 +388,91 @@ def handle_error(key):
         console.print(f"[link]{response['url']}[/link]")
 
 
+LATEST_FLUTTER_VERSION_TTL = 3600  # Seconds during which the latest Flutter version of Odevio is cached
+
+def _read_cache(section):
+    """ :return a dict of the values cached in a section of config.ini """
+    parser = ConfigParser(interpolation=None)
+    parser.read(get_config_path())
+    return dict(parser[section]) if parser.has_section(section) else {}
+
+
+def _write_cache(section, values):
+    """ Stores values in a section of config.ini. Can be called from several threads. """
+    with config_lock:
+        parser = ConfigParser(interpolation=None)
+        parser.read(get_config_path())
+        if not parser.has_section(section):
+            parser.add_section(section)
+        for key, value in values.items():
+            parser.set(section, key, value)
+        if not os.path.exists(click.get_app_dir(APP_NAME)):
+            os.makedirs(click.get_app_dir(APP_NAME))
+        save_config(parser)
+
+
+def server_supports(feature):
+    """ :return True if the server was seen supporting a feature that older servers ignore """
+    return _read_cache("server").get(feature) == "1"
+
+
+def set_server_supports(feature):
+    _write_cache("server", {feature: "1"})
+
+
+def local_flutter_version():
+    """ Gets the version of the local flutter command.
+
+    flutter --version takes a few seconds, so its result is cached in config.ini until the flutter command found in
+    the PATH or the version file of its SDK change.
+
+    :return the version, or None if flutter is not installed
+    """
+    import shutil
+    import subprocess
+
+    path = shutil.which("flutter")
+    if path is None:
+        return None
+    path = os.path.realpath(path)
+    try:
+        # The SDK version file is updated by flutter upgrade and flutter channel
+        cache_key = f"{path}:{os.path.getmtime(os.path.join(os.path.dirname(os.path.dirname(path)), 'version'))}"
+    except OSError:
+        cache_key = None
+    cache = _read_cache("flutter")
+    if cache_key and cache.get("local_version_key") == cache_key:
+        return cache.get("local_version")
+
+    output = subprocess.run([path, "--version"], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    match = re.match(r"Flutter ([^\s]+) ", output.stdout) if output.returncode == 0 else None
+    if match is None:
+        return None
+    if cache_key:
+        _write_cache("flutter", {"local_version_key": cache_key, "local_version": match.group(1)})
+    return match.group(1)
+
+
+def latest_flutter_version():
+    """ :return the Flutter version builds use when none is specified, cached for LATEST_FLUTTER_VERSION_TTL seconds,
+    or None if it could not be fetched
+    """
+    from odevio import api
+
+    cache = _read_cache("flutter")
+    try:
+        if float(cache.get("latest_version_time", 0)) > time.time() - LATEST_FLUTTER_VERSION_TTL:
+            return cache["latest_version"]
+    except (KeyError, ValueError):
+        pass
+    try:
+        version = api.get("/flutter-versions/latest")['version']
+    except Exception:
+        return None
+    _write_cache("flutter", {"latest_version": version, "latest_version_time": str(time.time())})
+    return version
+
+
 def check_new_version():
     config_file = get_config_path()
     parser = ConfigParser()
@@ -298,10 +501,4 @@ def check_new_version():
         # Ignore, no need to crash if we can't check for new updates
         pass
     finally:
-        if not parser.has_section("update"):
-            parser.add_section("update")
-        parser.set("update", "last_update_check", str(time.time()))
-        if not os.path.exists(click.get_app_dir(APP_NAME)):
-            os.makedirs(click.get_app_dir(APP_NAME))
-        with open(get_config_path(), "w") as fp:
-            parser.write(fp)
+        _write_cache("update", {"last_update_check": str(time.time())})
@@ -0,0 +1,276 @@
+#                                   #
+#   Local history of watched builds #
+#                                   #
+import gzip
+import io
+import json
+import os
+import time
+from collections import deque
+
+import click
+
+from odevio.settings import APP_NAME
+
+MAX_LOG_SIZE = 100 * 1000 * 1000  # Uncompressed bytes written for a single build
+MAX_BUILDS = 200  # Number of builds kept in the history
+MAX_TOTAL_SIZE = 500 * 1000 * 1000  # Compressed size of all the logs kept in the history
+
+FINAL_STATUSES = ["succeeded", "failed", "stopped"]
+# Phases of a build in the order they happen, from its status and then its substatus while it is in progress
+PHASES = ["created", "waiting_instance", "in_progress", "starting_instance", "preparing_build", "building",
+          "getting_result", "publishing"]
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def get_history_dir():
+    """ :return the directory where the logs and metadata of the watched builds are stored """
+    return os.path.join(click.get_app_dir(APP_NAME), "builds")
+
+
+def _record_path(key):
+    return os.path.join(get_history_dir(), f"{key}.json")
+
+
+def _log_path(key, compression):
+    return os.path.join(get_history_dir(), f"{key}.log.{'zst' if compression == 'zstd' else 'gz'}")
+
+
+def index_path(key):
+    """ :return the path of the file where the tokens of the logs of a build are indexed for searches """
+    return os.path.join(get_history_dir(), f"{key}.tokens.gz")
+
+
+def load_record(key):
+    """ :return the metadata stored for a build or None """
+    try:
+        with open(_record_path(key)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_record(record):
+    directory = get_history_dir()
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+    record["updated"] = time.time()
+    path = _record_path(record["key"])
+    with open(path + ".tmp", "w") as f:
+        json.dump(record, f)
+    os.replace(path + ".tmp", path)
+
+
+def update_record(key, **fields):
+    """ Stores fields in the metadata of a build, adding the build to the history if it is not in it yet """
+    record = load_record(key) or {"key": key}
+    record.update(fields)
+    save_record(record)
+
+
+def list_records():
+    """ :return the metadata of all the builds in the history, most recent first """
+    directory = get_history_dir()
+    if not os.path.isdir(directory):
+        return []
+    records = []
+    for name in os.listdir(directory):
+        if name.endswith(".json"):
+            record = load_record(name[:-5])
+            if record:
+                records.append(record)
+    records.sort(key=lambda r: r.get("updated", 0), reverse=True)
+    return records
+
+
+def delete(key):
+    record = load_record(key)
+    paths = [_record_path(key), index_path(key)]
+    if record and record.get("compression"):
+        paths.append(_log_path(key, record["compression"]))
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def evict(keep=None):
+    """ Removes the oldest builds from the history when it has more than MAX_BUILDS builds or takes more than
+    MAX_TOTAL_SIZE bytes. The build with key keep is never removed.
+    """
+    total_size = 0
+    for i, record in enumerate(list_records()):
+        total_size += record.get("compressed_size", 0)
+        if record["key"] != keep and (i >= MAX_BUILDS or total_size > MAX_TOTAL_SIZE):
+            delete(record["key"])
+
+
+def phase_of(status, substatus=None):
+    """ :return the phase of a build with this status and substatus """
+    if status == "in_progress" and substatus:
+        return substatus
+    return status
+
+
+def phase_durations(record):
+    """ :return a {phase: seconds} dict of the phases of a build whose start and end were both seen while it was
+    watched
+    """
+    durations = {}
+    transitions = record.get("transitions", [])
+    for current, following in zip(transitions, transitions[1:]):
+        if current["observed"] and following["observed"] and current["phase"] in PHASES:
+            durations[current["phase"]] = durations.get(current["phase"], 0) + following["time"] - current["time"]
+    return durations
+
+
+def open_log(key, mode="rt"):
+    """ Opens the local log file of a build.
+
+    :return a file object or None if the log is not stored locally
+    """
+    record = load_record(key)
+    if not record or not record.get("compression"):
+        return None
+    path = _log_path(key, record["compression"])
+    if not os.path.isfile(path):
+        return None
+    if record["compression"] == "zstd":
+        if zstandard is None:
+            return None
+        stream = io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True))
+        return io.TextIOWrapper(stream, encoding="utf-8") if "t" in mode else stream
+    return gzip.open(path, mode, encoding="utf-8" if "t" in mode else None)
+
+
+def is_complete(key):
+    """ :return True if the complete logs of a build are stored locally """
+    record = load_record(key)
+    return bool(record and record.get("complete"))
+
+
+def read_log(key, offset=0, tail=None):
+    """ Reads the logs of a build if a complete copy is stored locally.
+
+    :param offset: position in bytes from which to read the logs
+    :param tail: number of lines to read at the end of the logs
+    :return a (logs, end offset) tuple, or None if the logs are not stored locally
+    """
+    if not is_complete(key):
+        return None
+    record = load_record(key)
+    log_file = open_log(key, "rb")
+    if log_file is None:
+        return None
+    with log_file:
+        while offset > 0:  # Decompressed streams can only be read forward
+            skipped = len(log_file.read(min(offset, 1024*1024)))
+            if not skipped:
+                break
+            offset -= skipped
+        if tail is None:
+            data = log_file.read()
+        else:
+            data = b"".join(deque(log_file, maxlen=tail))
+    return data.decode("utf-8", errors="replace"), record["size"]
+
+
+class LogWriter:
+    """ Writes the logs of a build to a compressed file as they are streamed.
+
+    The logs are complete if the build is followed until it is finished and they do not exceed MAX_LOG_SIZE.
+
+    The transitions between the phases of the build are also timestamped in its record, and kept when it is watched
+    again. The phase the build is in when it starts being watched is not timed, unless submitted is True because the
+    build was just created. running_builds is the number of builds that were queued or in progress when it was
+    submitted, used to estimate the wait of the next builds.
+    """
+
+    def __init__(self, build_instance, submitted=False, running_builds=None):
+        self.key = build_instance["key"]
+        self.compression = "zstd" if zstandard is not None else "gzip"
+        self.size = 0
+        self.truncated = False
+        self.status = None
+        self.file = None
+        self.submitted = submitted
+        self.current_status = build_instance.get("status_code")
+        self.current_substatus = build_instance.get("substatus_code")
+        self.record = load_record(self.key) or {}
+        self.record.update({
+            "key": self.key,
+            "name": build_instance.get("name"),
+            "application": build_instance.get("application"),
+            "build_type": build_instance.get("build_type"),
+            "flutter_version": build_instance.get("flutter_version"),
+        })
+        self.record.setdefault("transitions", [])
+        if running_builds is not None:
+            self.record["running_at_submit"] = running_builds
+
+    def __enter__(self):
+        try:
+            if self.record.get("compression"):  # Watched again, the stream starts over
+                delete(self.key)
+            self.record.update({"compression": self.compression, "complete": False, "truncated": False})
+            save_record(self.record)
+            evict(keep=self.key)
+            path = _log_path(self.key, self.compression)
+            if self.compression == "zstd":
+                self.file = zstandard.ZstdCompressor().stream_writer(open(path, "wb"), closefd=True)
+            else:
+                self.file = gzip.open(path, "wb", compresslevel=6)
+        except OSError:
+            self.file = None  # Logs are still displayed if they can't be saved
+        if self.current_status:
+            self._transition(phase_of(self.current_status, self.current_substatus), observed=self.submitted)
+        return self
+
+    def write(self, text):
+        if self.file is None or self.truncated:
+            return
+        data = text.encode("utf-8")
+        if self.size + len(data) > MAX_LOG_SIZE:
+            self.truncated = True
+            return
+        self.size += len(data)
+        self.file.write(data)
+
+    def set_status(self, status):
+        self.status = status
+        if status != self.current_status:
+            self.current_status = status
+            self.current_substatus = None
+            self._transition(phase_of(status))
+
+    def set_substatus(self, substatus):
+        self.current_substatus = substatus
+        self._transition(phase_of(self.current_status, substatus))
+
+    def _transition(self, phase, observed=True):
+        transitions = self.record["transitions"]
+        if transitions and transitions[-1]["phase"] == phase:
+            return
+        transitions.append({"phase": phase, "time": time.time(), "observed": observed})
+        try:
+            save_record(self.record)
+        except OSError:
+            pass
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.file is None:
+            return
+        self.file.close()
+        self.record.update({
+            "status": self.status,
+            "complete": exc_type is None and self.status in FINAL_STATUSES and not self.truncated,
+            "truncated": self.truncated,
+            "size": self.size,
+            "compressed_size": os.path.getsize(_log_path(self.key, self.compression)),
+        })
+        save_record(self.record)
@@ -0,0 +1,112 @@
+#                                   #
+#   Search in the local build logs  #
+#                                   #
+import gzip
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from odevio import history
+
+TOKEN_RE = re.compile(r"\w{3,}")
+REGEX_CHARS = set(".^$*+?{}[]\\|()")
+
+
+def compile_patterns(patterns, ignore_case=False):
+    """ Compiles several patterns into a single regex matching any of them, so each line is scanned only once. """
+    return re.compile("|".join(f"(?:{pattern})" for pattern in patterns), re.IGNORECASE if ignore_case else 0)
+
+
+def _required_tokens(pattern):
+    """ :return the lower case tokens a line must contain to match a pattern, or None if it can't be known """
+    if any(c in REGEX_CHARS for c in pattern):
+        return None
+    pieces = re.split(r"(\W+)", pattern.lower())
+    tokens = set()
+    for i, piece in enumerate(pieces):
+        # The first and last words could be part of longer words in the logs
+        if i == 0 or i == len(pieces) - 1 or len(piece) < 3 or not TOKEN_RE.fullmatch(piece):
+            continue
+        tokens.add(piece)
+    return tokens
+
+
+def load_index(key):
+    """ :return the set of lower case tokens of the local logs of a build, or None if they are not indexed yet """
+    record = history.load_record(key)
+    path = history.index_path(key)
+    try:
+        if not record or os.path.getmtime(path) < record.get("updated", 0):
+            return None
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return set(f.read().split("\n"))
+    except OSError:
+        return None
+
+
+def save_index(key, tokens):
+    with gzip.open(history.index_path(key), "wt", encoding="utf-8") as f:
+        f.write("\n".join(sorted(tokens)))
+
+
+def can_match(index, patterns):
+    """ :return False if the index of a build shows that none of the patterns can match its logs """
+    for pattern in patterns:
+        tokens = _required_tokens(pattern)
+        if tokens is None or tokens <= index:
+            return True
+    return False
+
+
+def search_log(key, regex, build_index):
+    """ Scans the local logs of a build line by line.
+
+    :return a (key, matching lines, tokens) tuple, tokens being None if build_index is False
+    """
+    matches = []
+    tokens = set() if build_index else None
+    log_file = history.open_log(key)
+    if log_file is None:
+        return key, matches, None
+    with log_file:
+        for line in log_file:
+            if regex.search(line):
+                matches.append(line.rstrip("\n"))
+            if build_index:
+                tokens.update(TOKEN_RE.findall(line.lower()))
+    return key, matches, tokens
+
+
+def search(keys, patterns, ignore_case=False):
+    """ Searches the patterns in the local logs of several builds, in parallel worker processes.
+
+    Builds whose index shows they can't match are skipped, and the logs that are not indexed yet are indexed while
+    they are scanned.
+
+    :return an iterator of (key, matching lines) tuples, in the order the scans finish
+    """
+    regex = compile_patterns(patterns, ignore_case)
+    to_scan = []
+    for key in keys:
+        index = load_index(key)
+        if index is None:
+            to_scan.append((key, True))
+        elif can_match(index, patterns):
+            to_scan.append((key, False))
+    if len(to_scan) <= 1:
+        results = (search_log(key, regex, build_index) for key, build_index in to_scan)
+        yield from _save_indexes(results)
+        return
+    with ProcessPoolExecutor() as executor:
+        futures = [executor.submit(search_log, key, regex, build_index) for key, build_index in to_scan]
+        yield from _save_indexes(future.result() for future in as_completed(futures))
+
+
+def _save_indexes(results):
+    for key, matches, tokens in results:
+        if tokens is not None:
+            try:
+                save_index(key, tokens)
+            except OSError:
+                pass
+        yield key, matches
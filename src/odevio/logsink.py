@@ -0,0 +1,99 @@
+#                                   #
+#   Output of streamed build logs   #
+#                                   #
+import sys
+import threading
+
+
+class LogSink:
+    """ Buffers streamed build logs and writes them in batches at a fixed rate.
+
+    Verbose builds send thousands of lines per second. Printing each of them separately while a Rich spinner is
+    displayed makes Rich re-render the spinner for every line, so the logs are coalesced and written by a
+    background thread instead.
+
+    If no console is given, logs are written as-is to stdout without going through Rich.
+    """
+
+    def __init__(self, console=None, interval=0.1):
+        self.console = console
+        self.interval = interval
+        self._buffer = []
+        self._lock = threading.Lock()
+        # Held from taking the buffer to printing it, so batches flushed from two threads are printed in order
+        self._output_lock = threading.Lock()
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write(self, text):
+        with self._lock:
+            self._buffer.append(text)
+
+    def writelines(self, lines):
+        with self._lock:
+            self._buffer.extend(lines)
+
+    def close(self):
+        """ Stops the background thread and writes everything that is left. """
+        self._closed.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self.flush(final=True)
+
+    def flush(self, final=False):
+        with self._output_lock:
+            with self._lock:
+                if not self._buffer:
+                    return
+                text = "".join(self._buffer)
+                self._buffer.clear()
+                if self.console is not None and not final:
+                    # Rich always ends what it prints with a new line, so keep the last incomplete line for later
+                    cut = text.rfind("\n") + 1
+                    if cut < len(text):
+                        self._buffer.append(text[cut:])
+                        text = text[:cut]
+            if not text:
+                return
+            if self.console is None:
+                sys.stdout.write(text)
+                sys.stdout.flush()
+            else:
+                from rich.text import Text
+                self.console.print(Text.from_ansi(text))
+
+    def _run(self):
+        while not self._closed.wait(self.interval):
+            self.flush()
+
+
+class PlainStatus:
+    """ Replacement for a Rich status spinner when there is no terminal: status changes are written as log lines.
+
+    If sink is None, status changes are ignored.
+    """
+
+    def __init__(self, status, sink):
+        self.status = status
+        self.sink = sink
+
+    def __enter__(self):
+        if self.sink is not None:
+            self.sink.write(f"{self.status}\n")
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+    def update(self, status):
+        if status != self.status:
+            self.status = status
+            if self.sink is not None:
+                self.sink.write(f"{status}\n")
@@ -0,0 +1,119 @@
+#                                   #
+#   Models of the API payloads      #
+#                                   #
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+
+def parse_datetime(value):
+    """ Parses an ISO 8601 date returned by the API, such as 2023-01-31T14:05:12.123456+01:00.
+
+    :return the date in local time, or None if there is no date
+    """
+    if not value:
+        return None
+    if value[-1] == "Z":  # Not supported by fromisoformat before Python 3.11
+        value = value[:-1] + "+00:00"
+    date = datetime.fromisoformat(value)
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return date.astimezone()
+
+
+def format_datetime(value, format="%Y-%m-%d %H:%M", default="-"):
+    """ :return a parsed date formatted for display, or default if there is no date """
+    return value.strftime(format) if value else default
+
+
+# The models only keep the fields used by the commands. Their dates are parsed once, when they are loaded, and their
+# __slots__ make long listings take much less memory than the payloads.
+
+@dataclass
+class DeveloperAccount:
+    __slots__ = ("key", "name", "manager", "apple_id", "api_key_id")
+    key: str
+    name: str
+    manager: str
+    apple_id: str
+    api_key_id: str
+
+    @classmethod
+    def from_api(cls, data):
+        return cls(data["key"], data.get("name"), data.get("manager"), data.get("apple_id"), data.get("api_key_id"))
+
+
+@dataclass
+class Application:
+    __slots__ = ("key", "name", "apple_name", "bundle_id", "apple_id", "account")
+    key: str
+    name: str
+    apple_name: str
+    bundle_id: str
+    apple_id: str
+    account: DeveloperAccount
+
+    @classmethod
+    def from_api(cls, data):
+        account = data.get("account")
+        return cls(data["key"], data.get("name"), data.get("apple_name"), data.get("bundle_id"), data.get("apple_id"),
+                   DeveloperAccount.from_api(account) if isinstance(account, dict) else None)
+
+
+@dataclass
+class Team:
+    __slots__ = ("key", "name", "manager_username", "manager_email", "members", "applications",
+                 "apple_developer_accounts")
+    key: str
+    name: str
+    manager_username: str
+    manager_email: str
+    members: list
+    applications: list
+    apple_developer_accounts: list
+
+    @classmethod
+    def from_api(cls, data):
+        manager = data.get("manager")
+        if not isinstance(manager, dict):  # Only the username in some listings
+            manager = {"username": manager}
+        return cls(data["key"], data.get("name"), manager.get("username"), manager.get("email"),
+                   data.get("members", []),
+                   [Application.from_api(a) for a in data.get("applications", [])],
+                   [DeveloperAccount.from_api(a) for a in data.get("apple_developer_accounts", [])])
+
+
+@dataclass
+class ApiKey:
+    __slots__ = ("key",)
+    key: str
+
+    @classmethod
+    def from_api(cls, data):
+        """ :param data: a new key, or the first characters of a key as they are listed """
+        return cls(data["key"] if isinstance(data, dict) else data)
+
+
+@dataclass
+class Build:
+    __slots__ = ("key", "name", "application", "build_type", "status", "status_code", "substatus_code", "start_time",
+                 "finish_time", "stop_time", "creator", "certificate", "profile")
+    key: str
+    name: str
+    application: str
+    build_type: str
+    status: str
+    status_code: str
+    substatus_code: str
+    start_time: datetime
+    finish_time: datetime
+    stop_time: datetime
+    creator: str
+    certificate: str
+    profile: str
+
+    @classmethod
+    def from_api(cls, data):
+        return cls(data["key"], data.get("name"), data.get("application"), data.get("build_type"), data.get("status"),
+                   data.get("status_code"), data.get("substatus_code"), parse_datetime(data.get("start_time")),
+                   parse_datetime(data.get("finish_time")), parse_datetime(data.get("stop_time")),
+                   data.get("creator"), data.get("certificate"), data.get("profile"))
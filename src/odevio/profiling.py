@@ -0,0 +1,126 @@
+#                                   #
+#   Profiling of CLI commands       #
+#                                   #
+import sys
+import threading
+from collections import Counter
+
+
+def start(path, output_format="pstats", top=20):
+    """ Starts profiling the current command.
+
+    :return a function to call when the command is finished, which writes the profile to path and prints the top
+        functions on stderr
+    """
+    if output_format == "collapsed":
+        profiler = _SamplingProfiler()
+    else:
+        profiler = _DeterministicProfiler()
+    profiler.start()
+
+    def stop():
+        profiler.stop()
+        profiler.write(path)
+        profiler.print_top(top)
+        print(f"Profile written to {path}", file=sys.stderr)
+    return stop
+
+
+class _DeterministicProfiler:
+    """ cProfile based profiler, the output can be loaded with pstats, snakeviz, ...
+
+    Before Python 3.12, a cProfile profiler only sees the thread it was enabled in, so one is enabled in every thread
+    started while profiling, such as the log rendering and the tasks of build start, and their stats are merged.
+    """
+
+    def __init__(self):
+        import cProfile
+        self.profile_class = cProfile.Profile
+        self.profiles = [cProfile.Profile()]
+
+    def start(self):
+        if sys.version_info < (3, 12):
+            threading.setprofile(self._start_thread)
+        self.profiles[0].enable()
+
+    def _start_thread(self, frame, event, arg):
+        # Called for the first event of a new thread, the profiler replaces this function
+        profile = self.profile_class()
+        self.profiles.append(profile)
+        profile.enable()
+
+    def stop(self):
+        threading.setprofile(None)
+        self.profiles[0].disable()
+
+    def _stats(self, stream=None):
+        import pstats
+        stats = pstats.Stats(self.profiles[0], stream=stream)
+        for profile in self.profiles[1:]:
+            stats.add(profile)
+        return stats
+
+    def write(self, path):
+        self._stats().dump_stats(path)
+
+    def print_top(self, top):
+        self._stats(sys.stderr).sort_stats("cumulative").print_stats(top)
+
+
+class _SamplingProfiler:
+    """ Samples the stacks of all the threads at a fixed interval.
+
+    The output is in the collapsed stack format ("frame;frame;frame count" per line), which can be turned into a
+    flamegraph with flamegraph.pl, speedscope or inferno. The first frame of each stack is the name of its thread.
+    """
+
+    def __init__(self, interval=0.001):
+        self.interval = interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self.stopped.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                if stack:
+                    stack.append(f"thread {names.get(thread_id, thread_id)}")
+                    self.stacks[";".join(reversed(stack))] += 1
+
+    def write(self, path):
+        with open(path, "w") as f:
+            for stack, count in self.stacks.items():
+                f.write(f"{stack} {count}\n")
+
+    def print_top(self, top):
+        total = sum(self.stacks.values())
+        if total == 0:
+            print("No samples were collected", file=sys.stderr)
+            return
+        own = Counter()
+        cumulative = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            own[frames[-1]] += count
+            for frame in set(frames):
+                cumulative[frame] += count
+        print(f"{total} samples, every {self.interval*1000:g} ms", file=sys.stderr)
+        print(f"{'own %':>7} {'total %':>7}  function", file=sys.stderr)
+        for frame, count in own.most_common(top):
+            print(f"{count*100/total:7.1f} {cumulative[frame]*100/total:7.1f}  {frame}", file=sys.stderr)
@@ -0,0 +1,56 @@
+#                                   #
+#   Queue wait estimation           #
+#                                   #
+from odevio import history
+
+ACTIVE_STATUSES = ["created", "waiting_instance", "in_progress"]
+NEIGHBOURS = 10  # Number of past builds submitted with the closest number of running builds used for an estimate
+
+
+def percentile(values, percent):
+    """ :return the nearest-rank percentile of sorted values """
+    return values[max(0, -(-len(values) * percent // 100) - 1)]
+
+
+def is_running(build):
+    """ :return True if a build of a /builds/ list is queued or in progress. The listing has either the status code of
+    the builds or only their finish time.
+    """
+    if "status_code" in build:
+        return build["status_code"] in ACTIVE_STATUSES
+    return not build.get("finish_time")
+
+
+def count_running(builds):
+    """ :return the number of builds of a /builds/ list that are queued or in progress """
+    return sum(1 for b in builds or [] if is_running(b))
+
+
+def queue_wait(record):
+    """ :return how many seconds a build waited for an instance, or None if it was not watched since it was submitted
+    until it got one
+    """
+    durations = history.phase_durations(record)
+    if "created" not in durations:
+        return None
+    return durations["created"] + durations.get("waiting_instance", 0)
+
+
+def estimate(running):
+    """ Estimates the wait for an instance of a build submitted while running builds are queued or in progress, from
+    the waits of the past builds submitted with the closest number of running builds.
+
+    :return a (p50, p95, number of past builds) tuple of seconds, or None if there is no past build to compare with
+    """
+    samples = []
+    for record in history.list_records():
+        if record.get("running_at_submit") is None:
+            continue
+        wait = queue_wait(record)
+        if wait is not None:
+            samples.append((abs(record["running_at_submit"] - running), wait))
+    if not samples:
+        return None
+    samples.sort(key=lambda sample: sample[0])
+    waits = sorted(wait for distance, wait in samples[:NEIGHBOURS])
+    return percentile(waits, 50), percentile(waits, 95), len(waits)
@@ -1,4 +1,5 @@
 import os
+import threading
 from configparser import ConfigParser
 
 import click
@@ -10,6 +11,9 @@ API_BASE_URL = "https://odevio.com"
 
 console = Console()
 
+# Held from reading config.ini to writing it back, as it is updated from several threads (token, cached versions)
+config_lock = threading.RLock()
+
 
 def get_config_path():
     """ :return Odevio's config file path """
@@ -30,6 +34,19 @@ def read_config():
     }
 
 
+def save_config(parser):
+    """ Writes the config.ini file.
+
+    It is replaced at once, so other threads and processes never read it half written. Hold config_lock since it was
+    read.
+    """
+    config_file = get_config_path()
+    temp_file = f"{config_file}.{os.getpid()}.tmp"
+    with open(temp_file, 'w') as f:
+        parser.write(f)
+    os.replace(temp_file, config_file)
+
+
 def write_jwt_token(token):
     """ Writes the JWT token to the config.ini file.
 
@@ -37,33 +54,33 @@ def write_jwt_token(token):
     """
     config_directory = click.get_app_dir(APP_NAME)
     config_file = os.path.join(config_directory, 'config.ini')
-    parser = ConfigParser()
-    parser.read(config_file)
+    with config_lock:
+        parser = ConfigParser()
+        parser.read(config_file)
 
-    if not parser.has_section("auth"):
-        parser.add_section("auth")
-    parser.set("auth", "JWT_TOKEN", token)
+        if not parser.has_section("auth"):
+            parser.add_section("auth")
+        parser.set("auth", "JWT_TOKEN", token)
 
-    if not os.path.exists(config_directory):
-        os.makedirs(config_directory)
-        console.print(f"Created a configuration file for Odevio : {config_file}")
+        if not os.path.exists(config_directory):
+            os.makedirs(config_directory)
+            console.print(f"Created a configuration file for Odevio : {config_file}")
 
-    with open(config_file, 'w') as f:
-        parser.write(f)
+        save_config(parser)
 
 
 def delete_jwt_token():
     """ Deletes the JWT token from the config.ini file."""
     config_directory = click.get_app_dir(APP_NAME)
     config_file = os.path.join(config_directory, 'config.ini')
-    parser = ConfigParser()
-    parser.read(config_file)
+    with config_lock:
+        parser = ConfigParser()
+        parser.read(config_file)
 
-    if parser.has_section("auth") and parser.has_option("auth", "jwt_token"):
-        parser.remove_option("auth", "jwt_token")
+        if parser.has_section("auth") and parser.has_option("auth", "jwt_token"):
+            parser.remove_option("auth", "jwt_token")
 
-        with open(config_file, 'w') as f:
-            parser.write(f)
+            save_config(parser)
 
 
 def get_jwt_token():
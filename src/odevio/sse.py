@@ -0,0 +1,189 @@
+#                                   #
+#   Build events streaming (SSE)    #
+#                                   #
+import http.client
+import json
+import socket
+import time
+
+import requests
+import urllib3
+from click import ClickException
+
+FINAL_STATUSES = ["config", "succeeded", "failed", "stopped"]
+CHUNK_SIZE = 64 * 1024
+JSON_EVENTS = ["status", "substatus", "log", "cache"]  # Events whose data is JSON, the others are kept as text
+
+
+def _read_chunks(response, chunk_size=CHUNK_SIZE):
+    """ Yields the bytes of a streamed response as soon as they are received, up to chunk_size at a time.
+
+    Reading below requests skips the conversion of its errors, so the ones of the socket, http.client and urllib3 are
+    raised as requests.exceptions.ConnectionError like when the response is read with iter_content. Read timeouts are
+    raised as requests.exceptions.ReadTimeout, so they can be told apart from a dropped connection.
+    """
+    raw = response.raw
+    read1 = getattr(raw, "read1", None)  # urllib3 >= 2
+    if read1 is None and not response.headers.get("Content-Encoding"):
+        read1 = getattr(getattr(raw, "_fp", None), "read1", None)  # http.client response under urllib3 1.x
+    if read1 is None:
+        try:
+            yield from response.iter_content(chunk_size)
+        except requests.exceptions.ConnectionError as e:
+            if e.args and isinstance(e.args[0], urllib3.exceptions.ReadTimeoutError):
+                raise requests.exceptions.ReadTimeout(e.args[0])
+            raise
+        return
+    while True:
+        try:
+            chunk = read1(chunk_size)
+        except (socket.timeout, urllib3.exceptions.ReadTimeoutError) as e:
+            raise requests.exceptions.ReadTimeout(e)
+        except (OSError, http.client.HTTPException, urllib3.exceptions.HTTPError) as e:
+            raise requests.exceptions.ConnectionError(e)
+        if not chunk:
+            return
+        yield chunk
+
+
+def parse_events(chunks):
+    """ Incremental Server-Sent Events parser.
+
+    Takes an iterable of bytes and yields (event, data, id, retry) tuples with the data of the JSON_EVENTS decoded from
+    JSON, and the data of the other events, such as keep-alives, as a string. The events are split on the bytes of each
+    chunk, and consecutive log events of a chunk are merged in a single event whose data is the concatenation of their
+    lines, so they are decoded with one json.loads call and written at once.
+
+    An event that is not terminated by an empty line when the stream ends is incomplete and discarded.
+    """
+    buffer = bytearray()
+    pending_cr = False
+    for chunk in chunks:
+        if pending_cr:
+            chunk = b"\r" + chunk
+            pending_cr = False
+        if b"\r" in chunk:
+            if chunk.endswith(b"\r"):  # Could be the first half of a \r\n
+                chunk = chunk[:-1]
+                pending_cr = True
+            chunk = chunk.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+        buffer += chunk
+        end = buffer.rfind(b"\n\n")
+        if end == -1:
+            continue
+        end += 2
+        with memoryview(buffer) as view:
+            text = str(view[:end], "utf-8")
+        del buffer[:end]
+        yield from _parse_blocks(text)
+
+
+def _parse_blocks(text):
+    logs = []
+    log_id = None
+    for block in text.split("\n\n"):
+        event = "message"
+        data = []
+        event_id = None
+        retry = None
+        for line in block.split("\n"):
+            if not line or line[0] == ":":  # Empty line or comment
+                continue
+            field, _, value = line.partition(":")
+            if value[:1] == " ":
+                value = value[1:]
+            if field == "data":
+                data.append(value)
+            elif field == "event":
+                event = value
+            elif field == "id":
+                event_id = value
+            elif field == "retry":
+                retry = value
+        if not data:
+            if retry is not None or event_id is not None:
+                yield from _flush_logs(logs, log_id)
+                logs = []
+                yield None, None, event_id, retry
+            continue
+        if event == "log" and retry is None:
+            logs.append("\n".join(data))
+            log_id = event_id or log_id
+            continue
+        yield from _flush_logs(logs, log_id)
+        logs = []
+        data = "\n".join(data)
+        yield event, json.loads(data) if event in JSON_EVENTS else data, event_id, retry
+    yield from _flush_logs(logs, log_id)
+
+
+def _flush_logs(logs, log_id):
+    if not logs:
+        return
+    try:
+        lines = json.loads("[" + ",".join(logs) + "]")
+    except ValueError:
+        lines = [json.loads(log) for log in logs]
+    yield "log", "".join(lines), log_id, None
+
+
+def iter_events(response):
+    """ Parses the events of a streamed response, see parse_events. """
+    return parse_events(_read_chunks(response))
+
+
+def build_events(key, idle_timeout=60, max_failures=10):
+    """ Yields the (event, data) tuples of the event stream of a build until it reaches a final status.
+
+    When the connection drops, it is reopened with an exponential backoff, and the command fails after max_failures
+    attempts in a row. When it stays idle for idle_timeout seconds, which happens while the build waits for an instance,
+    it is reopened right away and this does not count as a failure. The stream is resumed after the last event received
+    thanks to the Last-Event-ID header. If the server does not send event ids, it sends the whole stream again and the
+    logs that were already received are skipped.
+    """
+    from odevio import api
+
+    last_event_id = None
+    log_length = 0  # Number of log characters received so far
+    retry_delay = 1
+    failures = 0
+    while True:
+        skip = log_length if last_event_id is None else 0
+        response = None
+        try:
+            response = api.get(f"/builds/{key}/logs", sse=True, timeout=(10, idle_timeout),
+                               headers={"Last-Event-ID": last_event_id} if last_event_id is not None else None)
+            if not response:
+                return
+            for event, data, event_id, retry in iter_events(response):
+                failures = 0
+                if retry and retry.isdigit():
+                    retry_delay = int(retry)/1000
+                if event_id:
+                    last_event_id = event_id
+                if event not in JSON_EVENTS:  # Keep-alives and the events the commands don't know about
+                    continue
+                if event == "log":
+                    if skip:
+                        if skip >= len(data):
+                            skip -= len(data)
+                            continue
+                        data = data[skip:]
+                        skip = 0
+                    log_length += len(data)
+                yield event, data
+                if event == "status" and data in FINAL_STATUSES:
+                    return
+        except requests.exceptions.ReadTimeout:
+            continue  # Idle, the stream is reopened right away without counting a failure
+        except (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError, requests.exceptions.Timeout):
+            pass
+        finally:
+            if response:
+                response.close()
+
+        # The stream ended before the build was finished
+        failures += 1
+        if failures > max_failures:
+            raise ClickException("Lost connection to the build events. Run odevio build detail to see the status of the build.")
+        time.sleep(min(retry_delay * 2**(failures-1), 30))
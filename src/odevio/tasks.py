@@ -0,0 +1,61 @@
+#                                   #
+#   Concurrent tasks of a command   #
+#                                   #
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from odevio import trace
+
+MAX_WORKERS = 8
+
+
+class TaskGraph:
+    """ Runs the tasks of a command in worker threads, each one as soon as the tasks it depends on are finished, while
+    the command goes on with what needs the main thread, such as prompts.
+
+    A task is a function called with the results of the tasks it depends on. If one of them failed, the task fails
+    with the same exception, which is raised when its result is read. Closing the graph, for example when the command
+    aborts, cancels the tasks that have not started and sets the cancelled event, which long tasks should check.
+    """
+
+    def __init__(self):
+        self.cancelled = threading.Event()
+        self._executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+        self._futures = {}
+
+    def add(self, name, function, after=()):
+        """ Schedules function(*results of the tasks in after) as the task name. """
+        # The dependencies were submitted before, so they are never waiting behind this task for a worker
+        dependencies = [self._futures[dependency] for dependency in after]
+
+        def run():
+            results = [dependency.result() for dependency in dependencies]
+            with trace.span(name, "task"):
+                return function(*results)
+
+        self._futures[name] = self._executor.submit(run)
+
+    def has(self, name):
+        return name in self._futures
+
+    def done(self, name):
+        return self._futures[name].done()
+
+    def result(self, name):
+        """ Waits for a task to finish.
+
+        :return its result, or raises the exception of the task
+        """
+        return self._futures[name].result()
+
+    def close(self):
+        self.cancelled.set()
+        for future in self._futures.values():
+            future.cancel()
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
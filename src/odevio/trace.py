@@ -0,0 +1,108 @@
+#                                   #
+#   Timing spans for --trace export  #
+#                                   #
+import json
+import os
+import threading
+import time
+
+_enabled = False
+_spans = []
+_lock = threading.Lock()
+_origin = time.perf_counter()
+_origin_wall = time.time()
+
+
+class Span:
+    """ A named, timed section of a command. Use it as a context manager or call finish() explicitly. """
+    __slots__ = ("name", "category", "args", "start", "end", "thread_id")
+
+    def __init__(self, name, category, args):
+        self.name = name
+        self.category = category
+        self.args = args
+        self.start = time.perf_counter()
+        self.end = None
+        self.thread_id = threading.get_ident()
+
+    def set(self, **args):
+        self.args.update(args)
+
+    def finish(self, **args):
+        if self.end is not None:
+            return
+        self.args.update(args)
+        self.end = time.perf_counter()
+        with _lock:
+            _spans.append(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.finish()
+
+
+class _NullSpan:
+    """ Span returned when tracing is disabled, so instrumented code does not pay for it. """
+    __slots__ = ()
+
+    def set(self, **args):
+        pass
+
+    def finish(self, **args):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+
+_null_span = _NullSpan()
+
+
+def enable():
+    """ Starts recording spans. """
+    global _enabled
+    _enabled = True
+
+
+def is_enabled():
+    return _enabled
+
+
+def span(name, category="cli", **args):
+    """ Starts a new span. It is recorded when finished, and only if tracing is enabled. """
+    if not _enabled:
+        return _null_span
+    return Span(name, category, args)
+
+
+def write(path):
+    """ Writes the recorded spans to a JSON file in the Trace Event Format.
+
+    The file can be opened with chrome://tracing or https://ui.perfetto.dev, and is easy to ingest in dashboards.
+    """
+    pid = os.getpid()
+    with _lock:
+        spans = sorted(_spans, key=lambda s: s.start)
+    events = [{
+        "name": s.name,
+        "cat": s.category,
+        "ph": "X",
+        "ts": round((s.start - _origin) * 1e6),
+        "dur": round((s.end - s.start) * 1e6),
+        "pid": pid,
+        "tid": s.thread_id,
+        "args": s.args,
+    } for s in spans]
+    with open(path, "w") as f:
+        json.dump({
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "otherData": {"start_time": _origin_wall},
+        }, f, indent=1, default=str)
@@ -0,0 +1,87 @@
+"""
+Unit tests of build logs with the offset and tail queries, against the stand-in of the API.
+
+Usage:
+    python -m unittest tests.logs_test
+"""
+
+import tempfile
+import unittest
+from unittest import mock
+
+from click.testing import CliRunner
+
+from odevio.commands.build import logs
+from tests.standin import StandIn
+
+LOGS = "".join(f"line {i} é\n" for i in range(1000))
+
+
+class TestLogs(unittest.TestCase):
+    def setUp(self):
+        # No local copy of the logs, they are fetched from the stand-in
+        self.history_dir = tempfile.TemporaryDirectory()
+        self.history_patch = mock.patch("odevio.history.get_history_dir", lambda: self.history_dir.name)
+        self.history_patch.start()
+        self.server = StandIn().__enter__()
+        self.server.logs["KEY"] = LOGS
+
+    def tearDown(self):
+        self.server.__exit__(None, None, None)
+        self.history_patch.stop()
+        self.history_dir.cleanup()
+
+    def run_logs(self, *args):
+        result = CliRunner().invoke(logs, ["KEY", "--raw", *args], catch_exceptions=False)
+        self.assertEqual(result.exit_code, 0)
+        return result.output
+
+    def log_queries(self):
+        return [query for method, path, query in self.server.requests if path == "/api/v1/builds/KEY/logs/"]
+
+    def test_all(self):
+        self.assertEqual(self.run_logs(), LOGS)
+
+    def test_tail(self):
+        self.assertEqual(self.run_logs("--tail", "3"), "line 997 é\nline 998 é\nline 999 é\n")
+        self.assertEqual(self.log_queries(), [{"tail": ["3"]}])
+
+    def test_since_offset(self):
+        offset = len(LOGS.encode()) - len("line 999 é\n".encode())
+        self.assertEqual(self.run_logs("--since-offset", str(offset)), "line 999 é\n")
+        self.assertEqual(self.log_queries(), [{"offset": [str(offset)]}])
+
+    def test_tail_zero(self):
+        self.assertEqual(self.run_logs("--tail", "0"), "")
+
+    def test_plain_string_fallback(self):
+        self.server.paginated_logs = False
+        self.assertEqual(self.run_logs("--tail", "2"), "line 998 é\nline 999 é\n")
+        offset = len(LOGS.encode()) - len("line 999 é\n".encode())
+        self.assertEqual(self.run_logs("--since-offset", str(offset)), "line 999 é\n")
+
+    def test_follow_skips_printed_logs(self):
+        self.server.status["KEY"] = "in_progress"
+        # The stand-in streams the logs from the start, the part already printed is skipped
+        self.assertEqual(self.run_logs("--tail", "2", "--follow"), "line 998 é\nline 999 é\n")
+        self.assertEqual(self.run_logs("--follow"), LOGS)
+        self.assertTrue(any(path.startswith("/events/builds/KEY/") for method, path, query in self.server.requests))
+
+    def test_follow_from_offset(self):
+        self.server.status["KEY"] = "in_progress"
+        offset = len(LOGS.encode()) - len("line 999 é\n".encode())
+        self.assertEqual(self.run_logs("--since-offset", str(offset), "--follow"), "line 999 é\n")
+
+    def test_follow_finished_build(self):
+        self.assertEqual(self.run_logs("--follow"), LOGS)
+        self.assertFalse(any(path.startswith("/events/") for method, path, query in self.server.requests))
+
+    def test_all_requires_grep(self):
+        result = CliRunner().invoke(logs, ["--all"])
+        self.assertEqual(result.exit_code, 2)
+        self.assertIn("--all requires --grep", result.output)
+        self.assertEqual(self.server.requests, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+"""
+Unit tests of the digest of the sources of a build and of the upload skipped when the server already has them, against
+the stand-in of the API.
+
+Usage:
+    python -m unittest tests.sources_test
+"""
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from odevio.commands.build import _submit_build, _submit_uploaded_source
+from odevio.helpers import source_digest, zip_directory
+from tests.standin import StandIn
+
+FILES = {
+    "pubspec.yaml": "name: app\n",
+    "lib/main.dart": "void main() {}\n",
+    "lib/src/widget.dart": "class Widget {}\n",
+    "ios/Podfile": "platform :ios, '12.0'\n",
+}
+
+
+def make_project(directory, files=FILES):
+    for path, content in files.items():
+        path = os.path.join(directory, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(content)
+
+
+def reversed_walk(walk):
+    """ :return os.walk listing the directories and files in reverse order """
+    def reversed_walk(top, **kwargs):
+        for dirpath, dirnames, filenames in walk(top, **kwargs):
+            dirnames.reverse()  # In place so the excluded directories are still pruned
+            yield dirpath, dirnames, filenames[::-1]
+    return reversed_walk
+
+
+class TestSourceDigest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.project = os.path.join(self.temp_dir.name, "project")
+        make_project(self.project)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def digest(self, excluded_dirs=(), excluded_files=()):
+        return source_digest(self.project, list(excluded_dirs), list(excluded_files))
+
+    def test_reproducible(self):
+        other = os.path.join(self.temp_dir.name, "other")
+        make_project(other, dict(reversed(list(FILES.items()))))
+        self.assertEqual(self.digest(), source_digest(other, [], []))
+        self.assertEqual(len(self.digest()), 64)
+
+    def test_ignores_dates(self):
+        digest = self.digest()
+        for path in FILES:
+            os.utime(os.path.join(self.project, path), (1000000000, 1000000000))
+        self.assertEqual(self.digest(), digest)
+
+    def test_ignores_walk_order(self):
+        digest = self.digest()
+        with mock.patch("os.walk", reversed_walk(os.walk)):
+            self.assertEqual(self.digest(), digest)
+
+    def test_content(self):
+        digest = self.digest()
+        with open(os.path.join(self.project, "lib/main.dart"), "a") as f:
+            f.write("// changed\n")
+        self.assertNotEqual(self.digest(), digest)
+
+    def test_renamed_file(self):
+        digest = self.digest()
+        os.rename(os.path.join(self.project, "lib/src/widget.dart"), os.path.join(self.project, "lib/widget.dart"))
+        self.assertNotEqual(self.digest(), digest)
+
+    def test_exclusions(self):
+        digest = self.digest(["secrets"], ["notes.txt"])
+        # Directories and files excluded by default and by .odevioignore
+        make_project(self.project, {
+            "build/ios/Runner.app": "binary",
+            ".dart_tool/package_config.json": "{}",
+            "source.zip": "zip",
+            "secrets/key.p8": "key",
+            "lib/notes.txt": "notes",
+        })
+        self.assertEqual(self.digest(["secrets"], ["notes.txt"]), digest)
+        self.assertNotEqual(self.digest(), digest)
+
+    def test_matches_zip(self):
+        import zipfile
+
+        make_project(self.project, {"build/app": "binary", "secrets/key.p8": "key"})
+        zip_file = zip_directory(self.project, ["secrets"], [], os.path.join(self.temp_dir.name, "source"))
+        with zipfile.ZipFile(zip_file) as archive:
+            archived = sorted(name for name in archive.namelist() if not name.endswith("/"))
+        self.assertEqual(archived, sorted(FILES))
+
+
+class TestUploadedSource(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        make_project(self.temp_dir.name)
+        self.fields = {
+            "application": "APP",
+            "build_type": "ad-hoc",
+            "source_digest": source_digest(self.temp_dir.name, [], []),
+        }
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_upload_skipped_on_hit(self):
+        with StandIn() as server:
+            self.assertIsNone(_submit_uploaded_source(self.fields))
+            zip_file = zip_directory(self.temp_dir.name, [], [], os.path.join(self.temp_dir.name, "source"))
+            first = _submit_build(self.fields, zip_file)
+            second = _submit_uploaded_source(self.fields)
+        self.assertEqual(server.uploads, [first["key"]])
+        self.assertEqual(second["key"], "B2")
+        self.assertEqual(server.builds["B2"]["source_digest"], self.fields["source_digest"])
+
+    def test_other_application(self):
+        with StandIn() as server:
+            server.sources.add(("OTHER", self.fields["source_digest"]))
+            self.assertIsNone(_submit_uploaded_source(self.fields))
+        self.assertEqual(server.builds, {})
+
+    def test_no_application(self):
+        with StandIn() as server:
+            self.assertIsNone(_submit_uploaded_source({**self.fields, "application": None}))
+        self.assertEqual(server.requests, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+"""
+Throughput benchmark of the build events parser (odevio.sse) against sseclient.
+
+Usage:
+    python -m tests.sse_benchmark [RECORDED_STREAM]
+
+RECORDED_STREAM is a raw event stream saved from /events/builds/<key>/logs, for example with
+curl -N -H "Authorization: JWT <token>" https://odevio.com/events/builds/<key>/logs > stream.txt
+If it is not given, a stream of 200 000 log lines is generated.
+
+Both parsers are given the same chunks, of 128 bytes as when requests iterates a streamed response with its default
+chunk size, and of CHUNK_SIZE bytes as odevio.sse reads a live stream, so the speed of the parsers is not mixed up with
+the chunk size. sseclient-py is needed, install it with pip install odevio[benchmark].
+"""
+
+import io
+import json
+import sys
+import time
+
+import sseclient
+
+from odevio.sse import parse_events, CHUNK_SIZE
+
+
+def generate_stream(lines=200000):
+    events = [("status", "in_progress"), ("substatus", "building")]
+    for i in range(lines):
+        events.append(("log", f"[{i}] Running pod install... Compiling lib/main.dart for the iOS target ({i % 97} files)\n"))
+    events.append(("status", "succeeded"))
+    return "".join(f"id: {i}\nevent: {event}\ndata: {json.dumps(data)}\n\n" for i, (event, data) in enumerate(events)).encode()
+
+
+def _chunks(stream, size):
+    return (stream[i:i+size] for i in range(0, len(stream), size))
+
+
+def run_sseclient(stream, chunk_size):
+    client = sseclient.SSEClient(_chunks(stream, chunk_size))
+    log = io.StringIO()
+    for event in client.events():
+        data = json.loads(event.data)
+        if event.event == "log":
+            log.write(data)
+    return log.tell()
+
+
+def run_parser(stream, chunk_size):
+    log = io.StringIO()
+    for event, data, event_id, retry in parse_events(_chunks(stream, chunk_size)):
+        if event == "log":
+            log.write(data)
+    return log.tell()
+
+
+def bench(name, function, stream, chunk_size, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        size = function(stream, chunk_size)
+        duration = time.perf_counter() - start
+        best = duration if best is None else min(best, duration)
+    print(f"{name:<12} {best*1000:9.1f} ms  {len(stream)/best/1e6:8.1f} MB/s  ({size} log characters)")
+    return best
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], "rb") as f:
+            stream = f.read()
+    else:
+        stream = generate_stream()
+    print(f"Stream of {len(stream)/1e6:.1f} MB, {stream.count(b'event: log')} log events")
+    for chunk_size in [128, CHUNK_SIZE]:
+        print(f"Chunks of {chunk_size} bytes")
+        reference = bench("sseclient", run_sseclient, stream, chunk_size)
+        parser = bench("odevio.sse", run_parser, stream, chunk_size)
+        print(f"Speedup: {reference/parser:.1f}x")
@@ -0,0 +1,170 @@
+"""
+Unit tests of the build events parser and stream reader (odevio.sse), which do not need an Odevio server.
+
+Usage:
+    python -m unittest tests.sse_test
+"""
+
+import socket
+import threading
+import unittest
+from unittest import mock
+
+import requests
+
+from odevio import sse
+from odevio.sse import parse_events, iter_events, build_events
+
+
+class StreamServer:
+    """ Local socket server answering every connection with the HTTP response head and chunks of body given, then
+    either closing the connection or leaving it idle.
+    """
+
+    def __init__(self, chunks, close=True):
+        self.chunks = chunks
+        self.close = close
+        self.socket = socket.socket()
+        self.socket.bind(("127.0.0.1", 0))
+        self.socket.listen()
+        self.url = f"http://127.0.0.1:{self.socket.getsockname()[1]}/"
+        self.connections = []
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        while True:
+            try:
+                connection, address = self.socket.accept()
+            except OSError:
+                return
+            self.connections.append(connection)
+            connection.recv(65536)
+            connection.sendall(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nTransfer-Encoding: chunked\r\n\r\n")
+            for chunk in self.chunks:
+                connection.sendall(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            if self.close:
+                connection.close()
+
+    def stop(self):
+        self.socket.close()
+        for connection in self.connections:
+            connection.close()
+
+
+class TestParseEvents(unittest.TestCase):
+    def test_events(self):
+        stream = [b'id: 1\nevent: status\ndata: "in_progress"\n\n: comment\nretry: 5000\n\n',
+                  b'id: 2\nevent: log\ndata: "a\\n"\n\nid: 3\nevent: log\ndata: "b\\n"\n\n']
+        self.assertEqual(list(parse_events(stream)), [
+            ("status", "in_progress", "1", None),
+            (None, None, None, "5000"),
+            ("log", "a\nb\n", "3", None),
+        ])
+
+    def test_other_events(self):
+        stream = [b'event: keep-alive\ndata:\n\nevent: stream-open\ndata: not json\n\n',
+                  b'event: cache\ndata: {"name": "pub", "hit": true}\n\n']
+        self.assertEqual(list(parse_events(stream)), [
+            ("keep-alive", "", None, None),
+            ("stream-open", "not json", None, None),
+            ("cache", {"name": "pub", "hit": True}, None, None),
+        ])
+
+    def test_truncated_tail(self):
+        stream = [b'id: 1\nevent: status\ndata: "in_progress"\n\n', b'id: 2\nevent: log\ndata: "hel']
+        self.assertEqual(list(parse_events(stream)), [("status", "in_progress", "1", None)])
+
+    def test_unterminated_last_event(self):
+        self.assertEqual(list(parse_events([b'event: status\ndata: "failed"\n'])), [])
+
+    def test_crlf_split_across_chunks(self):
+        stream = [b'id: 1\r\nevent: status\r', b'\ndata: "in_progress"\r\n\r', b'\nid: 2\r\nevent: log\r\n',
+                  b'data: "line\\n"\r\n\r\n']
+        self.assertEqual(list(parse_events(stream)), [
+            ("status", "in_progress", "1", None),
+            ("log", "line\n", "2", None),
+        ])
+
+    def test_utf8_split_across_chunks(self):
+        data = 'event: log\ndata: "été\\n"\n\n'.encode("utf-8")
+        self.assertEqual(list(parse_events([data[:18], data[18:]])), [("log", "été\n", None, None)])
+
+
+class TestReadStream(unittest.TestCase):
+    def _read(self, server, timeout=5):
+        try:
+            with requests.get(server.url, stream=True, timeout=(5, timeout)) as response:
+                return list(iter_events(response))
+        finally:
+            server.stop()
+
+    def test_complete(self):
+        server = StreamServer([b'event: status\ndata: "succeeded"\n\n', b""])
+        self.assertEqual(self._read(server), [("status", "succeeded", None, None)])
+
+    def test_drop(self):
+        server = StreamServer([b'event: status\ndata: "in_progress"\n\n', b'event: log\ndata: "hel'])
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            self._read(server)
+
+    def test_idle_timeout(self):
+        server = StreamServer([b'event: status\ndata: "in_progress"\n\n'], close=False)
+        with self.assertRaises(requests.exceptions.ReadTimeout):
+            self._read(server, timeout=0.5)
+
+
+class TestBuildEvents(unittest.TestCase):
+    def test_reconnects_after_drop(self):
+        servers = [
+            StreamServer([b'id: 1\nevent: status\ndata: "in_progress"\n\nid: 2\nevent: log\ndata: "a\\n"\n\n',
+                          b'id: 3\nevent: log\ndata: "b']),
+            StreamServer([b'id: 3\nevent: log\ndata: "b\\n"\n\nid: 4\nevent: status\ndata: "succeeded"\n\n', b""]),
+        ]
+        sent_headers = []
+
+        def get(route, sse=False, timeout=None, headers=None):
+            server = servers[len(sent_headers)]
+            sent_headers.append(headers)
+            return requests.get(server.url, stream=True, timeout=timeout, headers=headers)
+
+        with mock.patch("odevio.api.get", get), mock.patch.object(sse.time, "sleep"):
+            events = list(build_events("KEY"))
+        for server in servers:
+            server.stop()
+        self.assertEqual(events, [("status", "in_progress"), ("log", "a\n"), ("log", "b\n"), ("status", "succeeded")])
+        self.assertEqual(sent_headers, [None, {"Last-Event-ID": "2"}])
+
+    def test_idle_timeouts_are_not_failures(self):
+        servers = [StreamServer([b'id: 1\nevent: status\ndata: "waiting_instance"\n\n'], close=False)]
+        servers += [StreamServer([b": keep the connection\n\n"], close=False) for _ in range(3)]
+        servers.append(StreamServer([b'id: 2\nevent: status\ndata: "succeeded"\n\n', b""]))
+        opened = []
+
+        def get(route, sse=False, timeout=None, headers=None):
+            server = servers[len(opened)]
+            opened.append(server)
+            return requests.get(server.url, stream=True, timeout=timeout, headers=headers)
+
+        with mock.patch("odevio.api.get", get), mock.patch.object(sse.time, "sleep") as sleep:
+            events = list(build_events("KEY", idle_timeout=0.3, max_failures=1))
+        for server in servers:
+            server.stop()
+        self.assertEqual(events, [("status", "waiting_instance"), ("status", "succeeded")])
+        self.assertEqual(len(opened), 5)
+        sleep.assert_not_called()
+
+    def test_skips_other_events(self):
+        server = StreamServer([b'event: keep-alive\ndata:\n\nevent: stream-open\ndata: not json\n\n',
+                               b'event: status\ndata: "succeeded"\n\n', b""])
+
+        def get(route, sse=False, timeout=None, headers=None):
+            return requests.get(server.url, stream=True, timeout=timeout, headers=headers)
+
+        with mock.patch("odevio.api.get", get):
+            events = list(build_events("KEY"))
+        server.stop()
+        self.assertEqual(events, [("status", "succeeded")])
+
+
+if __name__ == '__main__':
+    unittest.main()
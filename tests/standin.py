@@ -0,0 +1,138 @@
+"""
+In-memory stand-in of the Odevio API for the unit tests, serving the routes of the features that can't be tested
+against a real server without running builds:
+
+- sources kept by digest: GET /applications/<app>/sources/<digest>/ and POST /builds/ with or without the zipped
+  sources
+- build logs: GET /builds/<key>/logs/ with the offset and tail parameters, and the event stream of a build
+
+Usage:
+    with StandIn() as server:
+        server.logs["KEY"] = "..."
+        ... code calling odevio.api ...
+"""
+
+import email.parser
+import json
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from unittest import mock
+from urllib.parse import urlsplit, parse_qs
+
+
+class StandIn:
+    def __init__(self):
+        self.sources = set()  # (application, digest) of the uploaded sources
+        self.builds = {}  # key: fields of the created builds
+        self.uploads = []  # keys of the builds created with the zipped sources
+        self.logs = {}  # key: logs of the builds
+        self.status = {}  # key: status code of the builds, succeeded by default
+        self.paginated_logs = True  # False to send the whole logs as a JSON string, like servers without offsets
+        self.requests = []  # (method, path, query) of the requests received
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._server.stand_in = self
+        self._patches = [
+            mock.patch("odevio.api.API_BASE_URL", f"http://127.0.0.1:{self._server.server_address[1]}"),
+            mock.patch("odevio.api.get_authorization_header", lambda *args, **kwargs: "JWT test"),
+            mock.patch("odevio.helpers.get_jwt_token", lambda: "test"),
+        ]
+
+    def __enter__(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        for patch in self._patches:
+            patch.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        for patch in self._patches:
+            patch.stop()
+        self._server.shutdown()
+        self._server.server_close()
+
+    def get(self, route, query):
+        parts = route.strip("/").split("/")
+        if parts[0] == "applications" and len(parts) == 4 and parts[2] == "sources":
+            if (parts[1], parts[3]) in self.sources:
+                return 200, {"digest": parts[3]}
+            return 404, {"detail": "Not found."}
+        if parts[0] == "builds" and len(parts) == 3 and parts[2] == "logs":
+            return self.get_logs(parts[1], query)
+        if parts[0] == "builds" and len(parts) == 2 and parts[1] in self.logs:
+            return 200, {"key": parts[1], "status_code": self.status.get(parts[1], "succeeded")}
+        return 404, {"detail": "Not found."}
+
+    def get_logs(self, key, query):
+        if key not in self.logs:
+            return 404, {"detail": "Not found."}
+        if not self.paginated_logs:
+            return 200, self.logs[key]
+        data = self.logs[key].encode()
+        content = data[int(query.get("offset", ["0"])[0]):]
+        if "tail" in query:
+            tail = int(query["tail"][0])
+            content = b"".join(content.splitlines(keepends=True)[-tail:]) if tail else b""
+        return 200, {"content": content.decode(), "size": len(data)}
+
+    def post_build(self, fields, uploaded):
+        if not uploaded and (fields.get("application"), fields.get("source_digest")) not in self.sources:
+            return 400, {"source": ["No file was submitted."]}
+        key = f"B{len(self.builds) + 1}"
+        self.builds[key] = fields
+        if uploaded:
+            self.uploads.append(key)
+            self.sources.add((fields.get("application"), fields.get("source_digest")))
+        return 201, {"key": key, "name": "Build", "application": fields.get("application"),
+                     "build_type": fields.get("build_type"), "status_code": "created"}
+
+    def events(self, key):
+        """ :return the event stream of a build, without event ids so it is sent from the start when reopened """
+        events = [("status", "in_progress")]
+        events += [("log", line) for line in self.logs[key].splitlines(keepends=True)]
+        events.append(("status", "succeeded"))
+        return "".join(f"event: {event}\ndata: {json.dumps(data)}\n\n" for event, data in events).encode()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type="application/json"):
+        if content_type == "application/json":
+            body = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        stand_in = self.server.stand_in
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        stand_in.requests.append(("GET", url.path, query))
+        if url.path.startswith("/events/builds/"):
+            return self._send(200, stand_in.events(url.path.split("/")[3]), "text/event-stream")
+        self._send(*stand_in.get(url.path[len("/api/v1"):], query))
+
+    def do_POST(self):
+        stand_in = self.server.stand_in
+        url = urlsplit(self.path)
+        stand_in.requests.append(("POST", url.path, parse_qs(url.query)))
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        content_type = self.headers.get("Content-Type", "")
+        fields = {}
+        uploaded = False
+        if content_type.startswith("multipart/form-data"):
+            message = email.parser.BytesParser().parsebytes(
+                f"Content-Type: {content_type}\r\n\r\n".encode() + body)
+            for part in message.get_payload():
+                name = part.get_param("name", header="content-disposition")
+                if part.get_filename():
+                    uploaded = True
+                else:
+                    fields[name] = part.get_payload(decode=True).decode()
+        else:
+            fields = {name: values[-1] for name, values in parse_qs(body.decode()).items()}
+        if url.path == "/api/v1/builds/":
+            return self._send(*stand_in.post_build(fields, uploaded))
+        self._send(404, {"detail": "Not found."})